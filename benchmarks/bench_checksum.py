@@ -0,0 +1,96 @@
+"""
+Microbenchmarks of the shared checksum module against the per-driver implementations it replaced: the Plantower frame
+sum, the Sensirion SHDLC checksum and the CRC-8 of the SHT35. Results of both implementations are checked to match.
+
+Run from the repository root: python benchmarks/bench_checksum.py
+"""
+
+import os
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(here, "..", "tests", "host"), os.path.join(here, "..", "lib")]
+
+from checksum import sum16, sensirion_checksum, crc8, check_words
+from sensor_frames import plantower_frame
+
+CALLS = 20000
+
+
+class DisabledLogger:
+    def debug(self, *args):
+        pass
+
+
+def legacy_plantower_sum(recv, logger=DisabledLogger()):
+    calc = 0
+    ord_arr = []
+    for c in bytearray(recv[:-2]):
+        calc += c
+        ord_arr.append(c)
+    logger.debug(str(ord_arr))
+    return calc
+
+
+def legacy_sensirion_checksum(header, data, logger=DisabledLogger()):
+    logger.debug("Type header : %s", type(header))
+    logger.debug("Type data : %s", type(data))
+    sum_bytes = bytes([(sum(data) + sum(header)) % 256])
+    lsb = (ord(sum_bytes) >> 0)
+    logger.debug("Checksum : 0x%02x", ord(bytes([255 - lsb])))
+    return bytes([255 - lsb])
+
+
+def legacy_crc(data):
+    crc = 0xff
+    for s in data:
+        crc ^= s
+        for i in range(8):
+            if crc & 0x80:
+                crc <<= 1
+                crc ^= 0x131
+            else:
+                crc <<= 1
+    return crc
+
+
+def rate(function, *args):
+    start = time.perf_counter()
+    for i in range(CALLS):
+        function(*args)
+    return CALLS / (time.perf_counter() - start)
+
+
+def report(name, legacy, shared):
+    print("{:>26}: {:9.0f} calls/s, replaced: {:9.0f} calls/s ({:.1f}x)".format(name, shared, legacy, shared / legacy))
+
+
+def main():
+    frame = plantower_frame([3, 5, 6, 3, 5, 6, 780, 231, 44, 4, 1, 300])
+    frame_view = memoryview(bytearray(frame))
+    assert legacy_plantower_sum(frame) == sum16(frame_view, 0, len(frame) - 2)
+    report("Plantower frame sum", rate(legacy_plantower_sum, frame), rate(sum16, frame_view, 0, len(frame) - 2))
+
+    # SHDLC frame of a measurement answer: address, command, state, length, 40 bytes of data
+    shdlc = bytearray([0x00, 0x03, 0x00, 40] + list(range(40)))
+    shdlc_view = memoryview(shdlc)
+    header, data = bytes(shdlc[:4]), bytes(shdlc[4:])
+    assert legacy_sensirion_checksum(header, data)[0] == sensirion_checksum(shdlc_view)
+    report("Sensirion SHDLC checksum", rate(legacy_sensirion_checksum, header, data), rate(sensirion_checksum, shdlc_view))
+
+    # SHT35 measurement: two words each followed by its CRC-8
+    words = bytearray(b'\x66\x66\x00\x73\x33\x00')
+    words[2] = legacy_crc(words[0:2])
+    words[5] = legacy_crc(words[3:5])
+    assert crc8(words, 0, 2) == words[2] and check_words(words) == -1
+
+    def legacy_check(data):
+        return legacy_crc(data[0:2]) == data[2] and legacy_crc(data[3:5]) == data[5]
+
+    report("SHT35 CRC-8 of a word", rate(legacy_crc, words[0:2]), rate(crc8, words, 0, 2))
+    report("SHT35 check of a reading", rate(legacy_check, words), rate(check_words, words))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Records per second of loggingpycom with the status logger format, for messages at an enabled level (INFO) and at a
+disabled level (DEBUG), written to a stream that drops them or queued by a QueueHandler as for the status log file.
+
+Run from the repository root: python benchmarks/bench_logging.py
+"""
+
+import os
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(here, "..", "tests", "host"), os.path.join(here, "..", "lib")]
+
+import loggingpycom as logging
+from loggingpycom import handlers
+from LoggerFactory import STATUS_FMT_DEFAULT
+
+RECORDS = 50000
+
+
+class NullStream:
+    def write(self, text):
+        return len(text)
+
+
+def records_per_second(log, queue_handler=None):
+    start = time.perf_counter()
+    for i in range(RECORDS):
+        log("Sensor %s read %d values", "PM1", i)
+        if queue_handler is not None and i % 100 == 99:
+            queue_handler.get_batch()  # drained in batches, as by the writer thread
+    return RECORDS / (time.perf_counter() - start)
+
+
+def main():
+    formatter = logging.Formatter(fmt=STATUS_FMT_DEFAULT)
+
+    stream_logger = logging.getLogger("bench_stream")
+    stream_logger.setLevel(logging.INFO)
+    stream_handler = logging.StreamHandler(NullStream())
+    stream_handler.setFormatter(formatter)
+    stream_logger.addHandler(stream_handler)
+
+    queue_logger = logging.getLogger("bench_queue")
+    queue_logger.setLevel(logging.INFO)
+    queue_handler = handlers.QueueHandler()
+    queue_handler.setFormatter(formatter)
+    queue_logger.addHandler(queue_handler)
+
+    cases = (
+        ("StreamHandler, enabled", stream_logger.info, None),
+        ("StreamHandler, disabled", stream_logger.debug, None),
+        ("QueueHandler, enabled", queue_logger.info, queue_handler),
+        ("QueueHandler, disabled", queue_logger.debug, queue_handler),
+    )
+    print("{} records with format {!r}".format(RECORDS, STATUS_FMT_DEFAULT))
+    for name, log, queue in cases:
+        print("{:>24}: {:10.0f} records/s".format(name, records_per_second(log, queue)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Frames per second and memory allocated per frame of the Plantower reader, compared with the reader that pulled one byte
+at a time from the UART. Frames are fed to the UART stand-in of tests/host.
+
+Run from the repository root: python benchmarks/bench_plantower.py
+"""
+
+import os
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(here, "..", "tests", "host"), os.path.join(here, "..", "lib")]
+
+from machine import UART
+from sensor_frames import plantower_frame
+from plantowerpycom import Plantower, PlantowerException
+from plantowerpycom.plantower import MSG_CHAR_1, MSG_CHAR_2
+
+FRAMES = 2000
+VALUES = [3, 5, 6, 3, 5, 6, 780, 231, 44, 4, 1, 300]
+NOISE = b'\x00\x13\x37'  # bytes between frames, without start characters that the old reader did not recover from
+
+
+def legacy_read(serial):
+    """
+    Reader before the receive buffer was introduced: one UART read per byte while looking for the start characters,
+    the frame is built by concatenation and converted with twelve round() calls
+    """
+    recv = b''
+    while True:
+        inp = serial.read(1)
+        if inp is None:
+            raise PlantowerException("No message received")
+        if inp == MSG_CHAR_1:
+            recv += inp
+            inp = serial.read(1)
+            if inp == MSG_CHAR_2:
+                recv += inp
+                recv += serial.read(30)
+                calc = 0
+                ord_arr = []
+                for c in bytearray(recv[:-2]):
+                    calc += c
+                    ord_arr.append(c)
+                str(ord_arr)  # formatted for a debug message, also when debug messages are disabled
+                if (recv[-2] << 8) | recv[-1] != calc:
+                    raise PlantowerException("Checksum failure")
+                return [round(recv[i] * 256 + recv[i + 1], 1) for i in range(4, 28, 2)]
+
+
+def feed(serial):
+    frame = plantower_frame(VALUES)
+    serial.feed((NOISE + frame) * FRAMES)
+
+
+def frames_per_second(read, serial):
+    feed(serial)
+    start = time.perf_counter()
+    for i in range(FRAMES):
+        read()
+    return FRAMES / (time.perf_counter() - start)
+
+
+def bytes_per_frame(read, serial):
+    """
+    Bytes allocated per frame: gc.mem_alloc with the garbage collector disabled on MicroPython, the peak of the memory
+    allocated during a read on CPython, where memory is freed as soon as it is not referenced
+    """
+    feed(serial)
+    try:
+        import gc
+        gc.collect()
+        gc.disable()
+        before = gc.mem_alloc()
+        for i in range(FRAMES):
+            read()
+        allocated = gc.mem_alloc() - before
+        gc.enable()
+        return allocated / FRAMES
+    except AttributeError:
+        import tracemalloc
+        tracemalloc.start()
+        peak = 0
+        for i in range(FRAMES):
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            read()
+            peak += tracemalloc.get_traced_memory()[1] - current
+        tracemalloc.stop()
+        return peak / FRAMES
+
+
+def main():
+    sensor = Plantower(read_timeout=1)
+    serial = UART.last
+    readers = (("buffered reader", sensor.read), ("byte-at-a-time reader", lambda: legacy_read(serial)))
+    print("{} frames with {} bytes of noise before each".format(FRAMES, len(NOISE)))
+    for name, read in readers:
+        rate = frames_per_second(read, serial)
+        allocated = bytes_per_frame(read, serial)
+        print("{:>22}: {:8.0f} frames/s, {:6.0f} bytes allocated per frame".format(name, rate, allocated))
+
+
+if __name__ == "__main__":
+    main()
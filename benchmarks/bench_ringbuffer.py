@@ -0,0 +1,179 @@
+"""
+File system calls per operation of the LoRa RingBuffer, in the binary layout with a persistent file handle and in the
+ASCII-pointer layout it replaced, which reopened the file and rewrote text pointers on every call. Calls are counted on
+the file objects and the os module, each of them is at least one call into the FAT driver on the device.
+
+Run from the repository root: python benchmarks/bench_ringbuffer.py
+"""
+
+import os
+import sys
+import tempfile
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(here, "..", "tests", "host"), os.path.join(here, "..", "lib")]
+
+import RingBuffer as ring_buffer_module
+from RingBuffer import RingBuffer
+
+CELL_NUMBER = 200
+CELL_SIZE = 100
+LINES = 500  # more lines than cells, so that the buffer wraps around and drops its tail
+LINE = "20,03,TPP,1,1500,1,-45,941,30,2,31,22,450,3,28,20,900"
+
+
+class CountingFile:
+    def __init__(self, counts, f):
+        self._counts = counts
+        self._f = f
+        counts["open"] = counts.get("open", 0) + 1
+
+    def _count(self, name):
+        self._counts[name] = self._counts.get(name, 0) + 1
+
+    def seek(self, *args):
+        self._count("seek")
+        return self._f.seek(*args)
+
+    def read(self, *args):
+        self._count("read")
+        return self._f.read(*args)
+
+    def write(self, data):
+        self._count("write")
+        self._counts["bytes written"] = self._counts.get("bytes written", 0) + len(data)
+        return self._f.write(data)
+
+    def flush(self):
+        self._count("flush")
+        return self._f.flush()
+
+    def close(self):
+        self._count("close")
+        return self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Counter:
+    def __init__(self):
+        self.counts = {}
+
+    def open(self, *args, **kwargs):
+        return CountingFile(self.counts, open(*args, **kwargs))
+
+    def reset(self):
+        self.counts.clear()  # files that are kept open hold on to the dictionary
+
+    def calls(self):
+        return sum(value for name, value in self.counts.items() if name != "bytes written")
+
+
+class Logger:
+    def debug(self, *args):
+        pass
+
+    info = warning = error = exception = debug
+
+
+class LegacyRingBuffer:
+    """
+    Write path of the ASCII-pointer layout: size, head and tail were stored as text in the first three cells, head and
+    tail as byte addresses
+    """
+
+    def __init__(self, file_path, cell_number, cell_size, open_file):
+        self.file_path = file_path
+        self.cell_size = cell_size
+        self.open = open_file
+        self.head_address = cell_size
+        self.tail_address = 2 * cell_size
+        self.buffer_start = 3 * cell_size
+        self.buffer_end = (cell_number + 3) * cell_size
+        self.head = self.buffer_start
+        self.tail = self.buffer_start
+        with open(file_path, 'wb') as f:
+            f.write(b'0' * self.buffer_end)
+
+    def write(self, line):
+        with self.open(self.file_path, 'r+b') as f:
+            f.seek(self.head)
+            f.write((line + "\n").encode())
+        next_head = self.head + self.cell_size
+        if next_head >= self.buffer_end:
+            next_head = self.buffer_start
+        if next_head == self.tail:
+            self.remove_tail()
+        with self.open(self.file_path, 'r+b') as f:
+            self.head = next_head
+            f.seek(self.head_address)
+            f.write((str(self.head) + "\n").encode())
+
+    def read(self):
+        with self.open(self.file_path, 'r+b') as f:
+            f.seek(self.head - self.cell_size if self.head != self.buffer_start else self.buffer_end - self.cell_size)
+            buffer_line = f.read(self.cell_size).decode()
+            return buffer_line[:buffer_line.find("\n")]
+
+    def remove_head(self):
+        with self.open(self.file_path, 'r+b') as f:
+            self.head -= self.cell_size
+            if self.head < self.buffer_start:
+                self.head = self.buffer_end - self.cell_size
+            f.seek(self.head_address)
+            f.write((str(self.head) + "\n").encode())
+
+    def remove_tail(self):
+        with self.open(self.file_path, 'r+b') as f:
+            self.tail += self.cell_size
+            if self.tail >= self.buffer_end:
+                self.tail = self.buffer_start
+            f.seek(self.tail_address)
+            f.write((str(self.tail) + "\n").encode())
+
+
+def measure(counter, buffer):
+    """
+    :return: counts per write, counts per uplink (read of the head and its removal)
+    """
+    counter.reset()
+    for i in range(LINES):
+        buffer.write(LINE)
+    writes = dict(counter.counts), counter.calls()
+
+    counter.reset()
+    for i in range(CELL_NUMBER // 2):
+        buffer.read()
+        buffer.remove_head()
+    sends = dict(counter.counts), counter.calls()
+    return writes, sends
+
+
+def report(name, operations, counts, calls):
+    details = ", ".join("{} {:.2f}".format(key, value / operations) for key, value in sorted(counts.items()))
+    print("{:>7}: {:5.2f} calls ({})".format(name, calls / operations, details))
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    counter = Counter()
+
+    legacy = LegacyRingBuffer(os.path.join(directory, "legacy"), CELL_NUMBER, CELL_SIZE, counter.open)
+
+    ring_buffer_module.open = counter.open  # calls of the module go through the counter
+    binary = RingBuffer(Logger(), directory + "/", "binary", CELL_NUMBER, CELL_SIZE)
+
+    print("{} writes to a buffer of {} cells, then {} uplinks".format(LINES, CELL_NUMBER, CELL_NUMBER // 2))
+    for name, buffer in (("ASCII", legacy), ("binary", binary)):
+        (write_counts, write_calls), (send_counts, send_calls) = measure(counter, buffer)
+        print(name + " layout")
+        report("write", LINES, write_counts, write_calls)
+        report("uplink", CELL_NUMBER // 2, send_counts, send_calls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+read_measurement calls per second of the SPS030 driver with its logger at WARN and at DEBUG. The sensor is modelled on
+the UART stand-in of tests/host and answers every command at once, so the 20 ms wait between a command and its answer
+is set to 0 and the figures show the cost of the driver and its logging alone. Debug messages are written to a stream
+that drops them.
+
+Run from the repository root: python benchmarks/bench_sensirion_logging.py
+"""
+
+import os
+import struct
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(here, "..", "tests", "host"), os.path.join(here, "..", "lib")]
+
+from machine import UART
+from sensor_frames import sensirion_frame
+from sensirionpycom import logging, Sensirion
+from sensirionpycom import sensirion as sensirion_module
+
+READS = 5000
+VALUES = (3.1, 5.2, 6.3, 6.9, 21.5, 25.2, 26.0, 26.1, 26.2, 0.6)  # mass and number concentrations, typical size
+
+
+class NullStream:
+    def write(self, text):
+        return len(text)
+
+
+class SPS030:
+    """
+    Answers every command written to the UART, with a measurement for CMD_READ_MEASUREMENT
+    """
+
+    def __init__(self):
+        self.measurement = sensirion_frame(sensirion_module.CMD_READ_MEASUREMENT[0], struct.pack('>10f', *VALUES))
+
+    def write(self, data, uart):
+        cmd = data[2]  # commands used here are never stuffed
+        if cmd == sensirion_module.CMD_READ_MEASUREMENT[0]:
+            uart.feed(self.measurement)
+        else:
+            uart.feed(sensirion_frame(cmd))
+
+
+def reads_per_second(sensor):
+    start = time.perf_counter()
+    for i in range(READS):
+        sensor.read_measurement()
+    return READS / (time.perf_counter() - start)
+
+
+def main():
+    sensirion_module.RX_DELAY_S = 0
+    logging.basicConfig(level=logging.WARN, stream=NullStream())
+    UART.device = SPS030()  # set on the class, as the driver resets the sensor when it opens the UART
+    sensor = Sensirion(read_timeout=1)
+    print("{} measurements of {} bytes".format(READS, len(SPS030().measurement)))
+    for name, level in (("WARN", logging.WARN), ("DEBUG", logging.DEBUG)):
+        sensor.set_log_level(level)
+        reads_per_second(sensor)  # warm up
+        print("{:>6}: {:8.0f} reads/s".format(name, reads_per_second(sensor)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 import strings as s
+from TaskScheduler import scheduler
 from ubinascii import hexlify
 from machine import unique_id
 from network import LoRa
 import os
 import ujson
+import sys
+import _thread
+
+SAVE_DELAY_MS = 1000  # changes saved within this window are written to the SD card together
 
 
 class ConfigurationException(Exception):
@@ -13,12 +18,56 @@ class ConfigurationException(Exception):
     pass
 
 
+class ConfigSnapshot:
+    __slots__ = ("interval_s", "gps_period_s", "lora_timeout_s", "air_time_ms", "daily_air_time_ms", "message_limit",
+                 "lora_slots", "lora_rate", "lora_compact", "sensors", "sensor_ids", "fmt", "fmt_version")
+
+    def __init__(self, configuration):
+        """
+        Typed values of the configuration and values derived from them, for reading as attributes on hot paths.
+        Attributes are read only, the snapshot is rebuilt by Configuration when the configuration changes.
+        :param configuration: complete configuration dictionary
+        :type configuration: dict
+        """
+
+        self.interval_s = int(float(configuration["interval"]) * 60)
+        self.gps_period_s = int(float(configuration["GPS_period"]) * 3600)
+        self.lora_timeout_s = int(configuration["lora_timeout"])
+
+        # air time allowed per day by the fair access policy, and the number of messages of air_time it allows
+        self.air_time_ms = max(int(float(configuration["air_time"])), 1)
+        self.daily_air_time_ms = int(float(configuration["fair_access"]) * 1000)
+        self.message_limit = self.daily_air_time_ms // self.air_time_ms
+        # send 2, 3 or at most 4 messages per interval based on length of interval
+        self.lora_slots = self.interval_s // 30  # lora_rate changes for each 30 seconds
+        max_lora_slot = max(self.message_limit // 96, 2)  # max number of msg per interval optimized around 15 min
+        self.lora_rate = min(self.lora_slots, max_lora_slot)
+        self.lora_compact = configuration.get("lora_compact", s.lora_compact) == "ON"  # delta encoded payloads
+
+        # sensors (TEMP, PM1, PM2) and whether they are enabled, their ids and the format they are sent in
+        self.sensors = {}
+        self.sensor_ids = {}
+        self.fmt = ""
+        for sensor_name in [s.TEMP, s.PM1, s.PM2]:
+            self.sensors[sensor_name] = configuration[sensor_name] != "OFF"
+            self.sensor_ids[sensor_name] = str(configuration[sensor_name + "_id"])
+            if self.sensors[sensor_name]:
+                self.fmt += sensor_name[0]  # eg.: TPP, TP, PP, P, T
+        self.fmt_version = str(configuration["fmt_version"])
+
+
 class Configuration:
 
     def __init__(self):
 
         self.configuration = {}
         self.default_configuration = s.default_configuration
+        self._snapshot = None
+
+        self.lock = _thread.allocate_lock()
+        self.dirty = False  # configuration has changes that are not saved to the SD card yet
+        self.save_task = None
+        self.listeners = []  # (keys, callback) of subsystems that apply changes of the keys without a reboot
 
     # Configuration Accessor/Getter
     def get_config(self, keys=None):
@@ -41,24 +90,117 @@ class Configuration:
     # Configuration Mutator/Setter
     def set_config(self, new_config):
         """
-        # Update configuration dict in code the running code
+        # Update configuration dict in code the running code, and notify listeners of the keys that changed
         :param new_config: set of new configuration key-value pairs
         :type new_config: dict
+        :return: keys whose values changed
+        :rtype: list of str
+        """
+
+        with self.lock:
+            changed = [key for key in new_config if key not in self.configuration or
+                       self.configuration[key] != new_config[key]]
+            self.configuration.update(new_config)
+            self._snapshot = None  # rebuilt on next use
+            callbacks = [callback for keys, callback in self.listeners if any(key in keys for key in changed)]
+
+        for callback in callbacks:
+            try:
+                callback(changed)
+            except Exception as e:
+                sys.print_exception(e)
+        return changed
+
+    def subscribe(self, keys, callback):
+        """
+        Registers a callback of a subsystem that applies changes of the keys in place, called with the list of changed
+        keys after set_config or save_config changed any of them
+        :param keys: keys the subsystem depends on
+        :type keys: tuple of str
+        :param callback: function taking the list of changed keys
+        :type callback: function
+        """
+
+        with self.lock:
+            self.listeners.append((keys, callback))
+
+    def is_hot(self, keys):
+        """
+        :param keys: keys in configuration dictionary
+        :type keys: list of str
+        :return: True if changes of all keys are applied by listeners without a reboot
+        :rtype: bool
         """
 
-        self.configuration.update(new_config)
+        with self.lock:
+            return all(any(key in listener_keys for listener_keys, callback in self.listeners) for key in keys)
+
+    def snapshot(self):
+        """
+        Gets typed and derived values of the configuration, rebuilt only after the configuration changed. The snapshot
+        is built under the lock, so that a snapshot of a configuration changed meanwhile is not kept.
+        :return: snapshot of the configuration
+        :rtype: ConfigSnapshot object
+        """
+
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self.lock:
+                if self._snapshot is None:
+                    self._snapshot = ConfigSnapshot(self.configuration)
+                snapshot = self._snapshot
+        return snapshot
 
     #  Saves keys and preferences to sd card
     def save_config(self, new_config):
         """
-        Updates configuration dict in the running code and in the SD card as well
+        Updates configuration dict in the running code and in the SD card as well. The SD card is written SAVE_DELAY_MS
+        after the first unsaved change, call flush before rebooting.
         :param new_config: set of new configuration key-value pairs
         :type new_config: dict
+        :return: keys whose values changed
+        :rtype: list of str
+        """
+        changed = self.set_config(new_config)
+        if not changed:
+            return changed
+
+        with self.lock:
+            self.dirty = True
+            if self.save_task is None:
+                self.save_task = scheduler.add(self._save_handler, ms=SAVE_DELAY_MS, periodic=False,
+                                               name="save config")
+        return changed
+
+    def _save_handler(self, arg):
+        self.flush()
+
+    def flush(self):
+        """
+        Writes unsaved changes of the configuration to the SD card
         """
-        self.set_config(new_config)
 
-        with open(s.root_path + s.config_filename, 'w') as f:  # save credentials to sd card
-            f.write(ujson.dumps(self.configuration))
+        with self.lock:
+            if self.save_task is not None:
+                self.save_task.cancel()
+                self.save_task = None
+            if self.dirty:
+                self._write(self.configuration)
+                self.dirty = False
+
+    def _write(self, configuration):
+        """
+        Writes the configuration to a temporary file and renames it to the configuration file, so that a reset while
+        writing leaves a complete file
+        """
+
+        with open(s.root_path + s.config_tmp_filename, 'w') as f:
+            f.write(ujson.dumps(configuration))
+        try:
+            os.remove(s.root_path + s.config_filename)  # FAT does not rename over an existing file
+        except OSError:
+            pass
+        os.rename(s.root_path + s.config_tmp_filename, s.root_path + s.config_filename)
 
     #  Reads and returns keys and preferences from sd card
     def read_configuration(self):
@@ -66,10 +208,17 @@ class Configuration:
         Read config file on SD card and load it to the configuration dict
         """
 
-        if s.config_filename not in os.listdir('/sd'):
-            with open('/sd/' + s.config_filename, 'w') as f:  # create new config file
-                f.write(ujson.dumps(self.default_configuration))
-                self.set_config(self.default_configuration)
+        files = os.listdir('/sd')
+        if s.config_tmp_filename in files:
+            if s.config_filename in files:  # configuration file is complete, the temporary file may not be
+                os.remove('/sd/' + s.config_tmp_filename)
+            else:  # reset after the old configuration file was removed, the temporary file is complete
+                os.rename('/sd/' + s.config_tmp_filename, '/sd/' + s.config_filename)
+                files.append(s.config_filename)
+
+        if s.config_filename not in files:
+            self._write(self.default_configuration)  # create new config file
+            self.set_config(self.default_configuration)
         else:
             with open('/sd/' + s.config_filename, 'r') as f:
                 self.set_config(ujson.loads(f.read()))
@@ -107,6 +256,7 @@ class Configuration:
         """
         try:
             self.configuration.clear()  # clear configuration
+            self._snapshot = None
             self.set_config(self.default_configuration)  # set configuration to default
 
             self.set_config({"device_id": hexlify(unique_id()).upper().decode("utf-8")})  # set new device_id
@@ -0,0 +1,110 @@
+from Configuration import config
+from checksum import crc8
+import strings as s
+import struct
+import _thread
+
+# Binary layout of the counters file: two slots of SLOT_SIZE bytes, written in turn, so that a write cut off by a reset
+# leaves the other slot valid. A slot is a sequence number, the counters in the order of COUNTER_NAMES and a CRC-8,
+# the valid slot with the highest sequence number is the current one.
+COUNTER_NAMES = ("air_time_used", "transmission_date")
+SLOT_FORMAT = '<I' + 'i' * len(COUNTER_NAMES)
+SLOT_CRC_OFFSET = struct.calcsize(SLOT_FORMAT)
+SLOT_SIZE = 16
+SLOTS = 2
+
+
+class Counters:
+    def __init__(self, path):
+        """
+        Small integer counters that change often, saved to a fixed size file without rewriting the configuration.
+        Counters are read from the configuration if the file does not exist yet.
+        :param path: path of the counters file
+        :type path: str
+        """
+
+        self.path = path
+        self.file = None
+        self.sequence = 0
+        self.values = {}
+        self.slot = bytearray(SLOT_SIZE)
+        self.lock = _thread.allocate_lock()
+
+    def _open(self):
+        """
+        Opens the counters file and loads the current slot, or creates the file. Lock has to be held.
+        """
+
+        try:
+            self.file = open(self.path, 'r+b')
+            data = self.file.read(SLOT_SIZE * SLOTS)
+        except OSError:
+            self.file = None
+            data = b''
+
+        best = None
+        for i in range(len(data) // SLOT_SIZE):
+            slot = data[i * SLOT_SIZE:(i + 1) * SLOT_SIZE]
+            if crc8(slot, 0, SLOT_CRC_OFFSET) != slot[SLOT_CRC_OFFSET]:
+                continue  # write of this slot was cut off
+            fields = struct.unpack_from(SLOT_FORMAT, slot)
+            if best is None or fields[0] > best[0]:
+                best = fields
+
+        if best is None:  # take the values last saved in the configuration
+            configuration = config.get_config()
+            self.values = {name: int(configuration.get(name, 0)) for name in COUNTER_NAMES}
+            # older versions saved the number of messages of air_time sent on transmission_date to the configuration,
+            # LoRaWAN.check_day drops the air time used unless that date is today
+            air_time_ms = config.snapshot().air_time_ms
+            self.values["air_time_used"] = int(configuration.get("message_count", 0)) * air_time_ms
+            if self.file is None:
+                self.file = open(self.path, 'w+b')
+                self.file.write(bytes(SLOT_SIZE * SLOTS))
+            self._write()
+        else:
+            self.sequence = best[0]
+            self.values = dict(zip(COUNTER_NAMES, best[1:]))
+
+    def _write(self):
+        """
+        Writes the counters to the slot after the current one. Lock has to be held.
+        """
+
+        self.sequence += 1
+        slot = self.slot
+        struct.pack_into(SLOT_FORMAT, slot, 0, self.sequence, *[self.values[name] for name in COUNTER_NAMES])
+        slot[SLOT_CRC_OFFSET] = crc8(slot, 0, SLOT_CRC_OFFSET)
+        self.file.seek((self.sequence % SLOTS) * SLOT_SIZE)
+        self.file.write(slot)
+        self.file.flush()
+
+    def get(self, name):
+        """
+        :param name: name of the counter, one of COUNTER_NAMES
+        :type name: str
+        :return: value of the counter
+        :rtype: int
+        """
+
+        with self.lock:
+            if self.file is None:
+                self._open()
+            return self.values[name]
+
+    def save(self, new_values):
+        """
+        Updates counters and saves them to the counters file with a single write
+        :param new_values: counter names and their values
+        :type new_values: dict
+        """
+
+        with self.lock:
+            if self.file is None:
+                self._open()
+            self.values.update(new_values)
+            self._write()
+
+
+# global counters, file is opened on first use
+counters = Counters(s.root_path + s.counters_filename)
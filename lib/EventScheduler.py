@@ -1,11 +1,10 @@
 import machine
-from machine import RTC, Timer
+from TaskScheduler import scheduler
 from averages import get_sensor_averages
 from helper import seconds_to_first_event
 from Configuration import config
 import GpsSIM28
 import _thread
-import time
 
 
 class EventScheduler:
@@ -27,12 +26,7 @@ class EventScheduler:
         self.lora = lora
 
         #  Attributes
-        if self.data_type == "sensors":
-            self.interval_s = int(float(config.get_config("interval"))*60)
-            if self.interval_s < 15 * 60:
-                self.logger.warning("Interval is less than 15 mins - real time transmission is not guaranteed")
-        elif self.data_type == "gps":
-            self.interval_s = int(float(config.get_config("GPS_period"))*3600)
+        self.interval_s = self.get_interval_s()
         self.s_to_next_lora = None
         self.first_alarm = None
         self.periodic_alarm = None
@@ -41,14 +35,42 @@ class EventScheduler:
         #  Start scheduling events
         self.start_events()
 
+        # reschedule events when the interval changes instead of rebooting
+        config.subscribe(("interval",) if self.data_type == "sensors" else ("GPS_period",), self.config_changed)
+
+    def get_interval_s(self):
+        if self.data_type == "sensors":
+            interval_s = config.snapshot().interval_s
+            if interval_s < 15 * 60:
+                self.logger.warning("Interval is less than 15 mins - real time transmission is not guaranteed")
+            return interval_s
+        elif self.data_type == "gps":
+            return config.snapshot().gps_period_s
+
+    def config_changed(self, keys):
+        """
+        Cancels the events of the old interval and schedules them with the new one
+        :param keys: changed keys of the configuration
+        :type keys: list of str
+        """
+
+        for alarm in (self.first_alarm, self.periodic_alarm):
+            if alarm is not None:
+                alarm.cancel()
+        self.periodic_alarm = None
+        self.interval_s = self.get_interval_s()
+        self.logger.info("Rescheduling {} events every {} seconds".format(self.data_type, self.interval_s))
+        self.start_events()
+
     #  Calculates time (s) until the first event, and sets up an alarm
     def start_events(self):
         first_event_s = seconds_to_first_event(self.interval_s)
-        self.first_alarm = Timer.Alarm(self.first_event, s=first_event_s, periodic=False)
+        self.first_alarm = scheduler.add(self.first_event, s=first_event_s, periodic=False, name="first event")
 
     def first_event(self, arg):
         #  set up periodic alarm with specified interval to calculate averages
-        self.periodic_alarm = Timer.Alarm(self.periodic_event, s=self.interval_s, periodic=True)
+        self.periodic_alarm = scheduler.add(self.periodic_event, s=self.interval_s, periodic=True,
+                                            name=self.data_type + " event")
         self.periodic_event(arg)
 
     def periodic_event(self, arg):
@@ -60,26 +82,18 @@ class EventScheduler:
             #  flash averages of PM data to sd card to be sent over LoRa
             get_sensor_averages(logger=self.logger, lora=self.lora)
 
+            # report lateness of timed tasks over the last interval
+            scheduler.log_report(self.logger)
+
             if self.lora is not False:  # Schedule LoRa messages if LoRa is enabled
-                # if device was last transmitting a day or more ago, reset message_count for the day
-                today = time.gmtime()
-                date = str(today[0]) + str(today[1]) + str(today[2])
-                if self.lora.transmission_date != date:
-                    self.lora.message_count = 0
-                    self.lora.transmission_date = date
-                    config.save_config({"message_count": self.lora.message_count, "transmission_date": date})
+                # if device was last transmitting a day or more ago, reset the air time used for the day
+                self.lora.check_day()
 
                 # send 2, 3 or at most 4 messages per interval based on length of interval
-                lora_slot = int(float(config.get_config("interval"))*60) // 30  # lora_rate changes for each 30 seconds
-                max_lora_slot = self.lora.message_limit // 96  # max number of msg per interval optimized around 15 min
-                if max_lora_slot < 2:
-                    max_lora_slot = 2
-                if lora_slot < 2:
+                snapshot = config.snapshot()
+                if snapshot.lora_slots < 2:
                     raise Exception("Interval has to be at least a minute")
-                else:
-                    lora_rate = lora_slot
-                    if lora_slot > max_lora_slot:
-                        lora_rate = max_lora_slot
+                lora_rate = snapshot.lora_rate
 
                 waiting = self.lora.lora_buffer.size(lora_rate)  # check number of messages in stack (up to max to send)
                 remaining = self.lora.message_limit - self.lora.message_count  # check how many more we can send today
@@ -90,15 +104,15 @@ class EventScheduler:
                 else:
                     count = remaining  # if we have less than we want to send, send up to the limit
                 for val in range(count):  # Schedule up to 4 randomly timed messages within interval
-                    self.random_alarm = Timer.Alarm(self.random_event, s=get_random_time(), periodic=False)
+                    self.random_alarm = scheduler.add(self.random_event, s=get_random_time(), periodic=False,
+                                                      name="lora event")
 
         else:
             raise Exception("Non existent data type")
 
     def random_event(self, arg):
-        # start LoRa thread
-        arg1, arg2 = 0, 0  # threading library not fully implemented - only works with a tuple of at least 2 args
-        _thread.start_new_thread(self.lora.lora_send, (arg1, arg2))
+        # queue a message for the LoRa transmitter thread
+        self.lora.request_send()
 
 
 def get_random_time():
@@ -109,6 +123,6 @@ def get_random_time():
     """
 
     # get random number of seconds within (interval - lora_timeout) and add one so it cannot be zero
-    s_to_next_lora = int((machine.rng() / (2 ** 24)) * (int(float(config.get_config("interval"))*60) -
-                                                        int(config.get_config("lora_timeout")))) + 1
+    snapshot = config.snapshot()
+    s_to_next_lora = int((machine.rng() / (2 ** 24)) * (snapshot.interval_s - snapshot.lora_timeout_s)) + 1
     return s_to_next_lora
@@ -1,4 +1,5 @@
 from machine import UART, Timer, Pin
+from TaskScheduler import scheduler
 from micropyGPS import MicropyGPS
 from RtcDS1307 import clock
 from Configuration import config
@@ -27,7 +28,7 @@ def gps_init(logger):
     :param logger: status logger
     :type logger: LoggerFactory object
     :return: serial, chrono, inidcator_led
-    :rtype: UART object, Chrono object, Alarm object
+    :rtype: UART object, Chrono object, Task object
     """
 
     logger.info("Turning GPS on - Terminal output is disabled until GPS finishes")
@@ -42,7 +43,7 @@ def gps_init(logger):
     chrono = Timer.Chrono()
     chrono.start()
 
-    indicator_led = Timer.Alarm(blink_led, s=1.6, arg=(0x000055, 0.4, False), periodic=True)
+    indicator_led = scheduler.add(blink_led, s=1.6, arg=(0x000055, 0.4, False), periodic=True, name="GPS indicator")
 
     return serial, chrono, indicator_led
 
@@ -58,7 +59,7 @@ def gps_deinit(serial, logger, message, indicator_led):
     :param message: message to display after terminal output was enabled
     :type message: str
     :param indicator_led: Timer for led indicator
-    :type indicator_led: Timer object
+    :type indicator_led: Task object
     """
 
     # turn off GPS via turning off transistor
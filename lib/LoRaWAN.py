@@ -1,14 +1,22 @@
 from Configuration import config
+from Counters import counters
 import strings as s
-from helper import blink_led, lora_lock, minutes_of_the_month
+from helper import blink_led, lora_lock, month_expiry_cutoff, buffer_line_timestamp
+from LoggerFactory import flush_logs
 from RingBuffer import RingBuffer
-import struct
+from lora_payload import is_compact, compact_indices, compact_header, compact_message, cast_message, pack_message, \
+    time_on_air_ms, PayloadException
 import os
 from network import LoRa
 import socket
 import ubinascii
 import time
 import machine
+import _thread
+
+# Commands for the LoRa transmitter thread
+LORA_SEND = 0  # send up to the given number of uplinks
+LORA_QUEUE_SIZE = 8  # maximum number of pending commands
 
 
 class LoRaWAN:
@@ -20,18 +28,16 @@ class LoRaWAN:
         """
 
         self.logger = logger
-        self.message_limit = int(float(config.get_config("fair_access")) / (float(config.get_config("air_time")) / 1000))
-        self.transmission_date = config.get_config("transmission_date")  # last date when lora was transmitting
-        today = time.gmtime()
-        date = str(today[0]) + str(today[1]) + str(today[2])
-        if self.transmission_date == date:  # if device was last transmitting today
-            self.message_count = config.get_config("message_count")  # get number of messages sent today
-        else:
-            self.message_count = 0  # if device was last transmitting a day or more ago, reset message_count for the day
-            self.transmission_date = date
-            config.save_config({"message_count": self.message_count, "transmission_date": date})
+        snapshot = config.snapshot()
+        self.message_limit = snapshot.message_limit
+        self.air_time_ms = snapshot.air_time_ms
+        self.daily_air_time_ms = snapshot.daily_air_time_ms
+        self.transmission_date = str(counters.get("transmission_date"))  # last date when lora was transmitting
+        self.air_time_used = counters.get("air_time_used")  # air time (ms) of the uplinks sent on that date
+        self.check_day()  # if device was last transmitting a day or more ago, reset the air time used for the day
 
         regions = {"Europe": LoRa.EU868, "Asia": LoRa.AS923, "Australia": LoRa.AU915, "United States": LoRa.US915}
+        self.max_payload = s.lora_max_payload[config.get_config("region")]  # payload limits of the region
         region = regions[config.get_config("region")]
 
         self.lora = LoRa(mode=LoRa.LORAWAN, region=region, adr=True)
@@ -59,12 +65,27 @@ class LoRaWAN:
         self.lora.callback(trigger=LoRa.RX_PACKET_EVENT, handler=self.lora_recv)
 
         # initialises circular lora stack to back up data up to about 22.5 days depending on the length of the month
-        self.lora_buffer = RingBuffer(self.logger, s.processing_path, s.lora_file_name, 31 * self.message_limit, 100)
+        self.lora_buffer = RingBuffer(self.logger, s.processing_path, s.lora_file_name, 31 * self.message_limit, 100,
+                                      get_timestamp=buffer_line_timestamp)
 
-        try:  # this fails if the buffer is empty
-            self.check_date()  # remove messages that are over a month old
-        except Exception as e:
-            pass
+        # format and sensor ids of the last compact payload, acknowledged by the back-end over LoRa
+        self.ids_key = None
+        self.compact_payloads = 0  # compact payloads sent since the sensor ids were last included
+
+        # last uplink failed, e.g. because ADR lowered the data rate below the one the payload was sized for
+        self.send_failed = False
+
+        self.check_date()  # remove messages that are over a month old
+
+        # apply changes of the message limit and timeout without a reboot
+        config.subscribe(("fair_access", "air_time", "lora_timeout"), self.config_changed)
+
+        # single transmitter thread fed by a bounded command queue, woken up by releasing the wakeup lock
+        self.commands = []
+        self.commands_lock = _thread.allocate_lock()
+        self.wakeup = _thread.allocate_lock()
+        self.wakeup.acquire()
+        _thread.start_new_thread(self.transmitter, (0, 0))
 
     def lora_recv(self, arg):
         """
@@ -80,36 +101,129 @@ class LoRaWAN:
             if msg == "0":  # reboot device
                 self.logger.info("Reset triggered over LoRa")
                 self.logger.info("Rebooting...")
+                config.flush()
+                flush_logs()
                 machine.reset()
             elif msg == "1":  # start software update
                 self.logger.info("Software update triggered over LoRa")
                 config.save_config({"update": True})
+                config.flush()
+                flush_logs()
                 machine.reset()
             else:
                 split_msg = msg.split(":")
                 if split_msg[0] == "2":  # update wifi credentials
                     self.logger.info("WiFi credentials updated over LoRa")
                     config.save_config({"SSID": split_msg[1], "wifi_password": split_msg[2]})
+                elif split_msg[0] == "4":  # back-end knows the sensor ids, stop sending them in compact payloads
+                    if self.ids_key is not None:
+                        self.logger.info("Sensor ids acknowledged over LoRa")
+                        config.save_config({"lora_acked_ids": self.ids_key})
+                elif split_msg[0] == "5":  # back-end lost the sensor ids, include them in the next compact payload
+                    self.logger.info("Sensor ids requested over LoRa")
+                    self.compact_payloads = 0
                 elif split_msg[0] == "3":  # update wifi credentials and start software update
                     self.logger.info("WiFi credentials updated over LoRa")
                     config.save_config({"SSID": split_msg[1], "wifi_password": split_msg[2]})
                     self.logger.info("Software update triggered over LoRa")
                     config.save_config({"update": True})
+                    config.flush()
+                    flush_logs()
                     machine.reset()
                 else:
                     self.logger.error("Unknown command received over LoRa")
         except Exception as e:
             self.logger.exception("Failed to interpret message received over LoRa")
 
-    def lora_send(self, arg1, arg2):
-        """Lora send method to run as a thread. Checks if messages are up to date in the lora buffer, pops the one on
-        top of the stack, encodes it to a message and sends it to the right port.
-        Takes two dummy arguments required by the threading library"""
+    def config_changed(self, keys):
+        """
+        Recomputes the message limit, resizes the lora buffer accordingly and sets the timeout for sending data
+        :param keys: changed keys of the configuration
+        :type keys: list of str
+        """
+
+        snapshot = config.snapshot()
+        self.message_limit = snapshot.message_limit
+        self.air_time_ms = snapshot.air_time_ms
+        self.daily_air_time_ms = snapshot.daily_air_time_ms
+        self.lora_socket.settimeout(snapshot.lora_timeout_s * 1000)
+        self.lora_buffer.resize(31 * self.message_limit)
+        self.logger.info("LoRa message limit set to {} per day".format(self.message_limit))
+
+    @property
+    def message_count(self):
+        """
+        Number of messages of the configured air time that the uplinks sent today are charged as
+        :rtype: int
+        """
+        return -(-self.air_time_used // self.air_time_ms)
+
+    def check_day(self):
+        """
+        Resets the air time used for the day if the device was last transmitting on another day
+        """
+
+        today = time.gmtime()
+        date = str(today[0]) + str(today[1]) + str(today[2])
+        if self.transmission_date != date:
+            self.air_time_used = 0
+            self.transmission_date = date
+            counters.save({"air_time_used": self.air_time_used, "transmission_date": int(date)})
+
+    def post(self, command, count=1):
+        """
+        Queues a command for the transmitter thread. Consecutive send commands are merged, commands are dropped if the
+        queue is full.
+        :param command: LORA_SEND
+        :type command: int
+        :param count: number of uplinks for LORA_SEND
+        :type count: int
+        """
+
+        with self.commands_lock:
+            if command == LORA_SEND and self.commands and self.commands[-1][0] == LORA_SEND:
+                self.commands[-1][1] += count
+            elif len(self.commands) < LORA_QUEUE_SIZE:
+                self.commands.append([command, count])
+            else:
+                self.logger.warning("LoRa command queue is full, command dropped")
+                return
+            if self.wakeup.locked():
+                self.wakeup.release()
+
+    def request_send(self, count=1):
+        self.post(LORA_SEND, count)
+
+    def transmitter(self, arg1, arg2):
+        """
+        Transmitter thread that executes queued commands in order. Takes two dummy arguments required by the threading
+        library
+        """
+
+        self.logger.debug("LoRa transmitter thread started")
+        while True:
+            self.wakeup.acquire()  # wait for commands
+            while True:
+                with self.commands_lock:
+                    if not self.commands:
+                        break
+                    command, count = self.commands.pop(0)
+
+                if command == LORA_SEND:
+                    for val in range(count):
+                        self.lora_send()
+
+    def lora_send(self):
+        """Checks if messages are up to date in the lora buffer, pops the ones on top of the stack, encodes them to a
+        message and sends it to the right port. Called by the transmitter thread.
+        :return: True if a message was sent
+        :rtype: bool
+        """
 
         if lora_lock.locked():
             self.logger.debug("Waiting for other lora thread to finish")
         with lora_lock:
-            self.logger.debug("LoRa thread started")
+            self.logger.debug("LoRa send started")
 
             try:
                 self.check_date()  # remove messages that are over a month old
@@ -121,77 +235,176 @@ class LoRaWAN:
 
                 if s.lora_file_name not in os.listdir(s.root_path + s.processing):
                     raise Exception('LoRa - File: {} does not exist'.format(s.lora_file_name))
+                elif self.lora_buffer.size() == 0:
+                    self.logger.debug("LoRa - no messages to send")  # previous uplinks sent them in a batch
+                    return False
                 else:
-                    port, payload = self.get_sending_details()
+                    try:
+                        port, payload, count = self.get_sending_details()
+                    except PayloadException as e:
+                        self.lora_buffer.remove_head()  # message would never be sent, drop it
+                        raise e
 
                     self.lora_socket.bind(port)  # bind to port to decode at backend
-                    self.lora_socket.send(payload)  # send payload to the connected socket
-                    self.logger.debug("LoRa - sent payload")
-
-                    self.message_count += 1  # increment number of files sent over LoRa today
-                    config.save_config({"message_count": self.message_count})  # save number of messages today
-
-                    # remove message sent
-                    self.lora_buffer.remove_head()
+                    try:
+                        self.lora_socket.send(payload)  # send payload to the connected socket
+                    except Exception as e:
+                        self.send_failed = True  # size the next payload for the slowest data rate
+                        raise e
+                    self.send_failed = False
+                    self.logger.debug("LoRa - sent payload with {} message(s)".format(count))
+
+                    # charge the air time of the payload, which grows with the number of messages in it
+                    self.air_time_used += time_on_air_ms(len(payload), self.get_spreading_factor())
+                    counters.save({"air_time_used": self.air_time_used})  # save air time used today
+
+                    # remove messages sent
+                    self.lora_buffer.remove_head(count)
+                    return True
 
             except Exception as e:
                 self.logger.exception("Sending payload over LoRaWAN failed")
                 blink_led((0x550000, 0.4, True))
+                return False
 
     def get_sending_details(self):
         """
-        Gets message sitting on top of the lora stack, and constructs payload according to its format
-        :return: port, payload
-        :rtype: int, bytes
+        Gets messages sitting on top of the lora stack and constructs payload. If compact payloads are enabled,
+        consecutive messages of the same integer format are delta encoded. Otherwise, if more than one message fits the
+        payload limit, messages are packed into a batch. A single message is sent on the port of its format.
+        :return: port, payload, number of messages in the payload
+        :rtype: int, bytes, int
         """
 
         buffer_line = self.lora_buffer.read()
-        buffer_lst = buffer_line.split(',')  # convert string to a list of strings
-
-        # get structure and port from format
-        fmt = buffer_lst[2]  # format is third item in the list
-        fmt_dict = {"TPP": s.TPP, "TP": s.TP, "PP": s.PP, "P": s.P, "T": s.T, "G": s.G}
-        port_struct_dict = fmt_dict[fmt]  # get dictionary corresponding to the format
-        port = port_struct_dict["port"]  # get port corresponding to the format
-        structure = port_struct_dict["structure"]  # get structure corresponding to the format
-
-        # cast message according to format to form valid payload
-        lst_message = buffer_lst[3:]  # chop year, month and format off
-        cast_lst_message = []
-        for i in range((len(structure) - 1)):  # iterate for length of structure having '<' stripped
-            if structure[i + 1] == 'f':  # iterate through structure ignoring '<'
-                cast_lst_message.append(float(lst_message[i]))  # cast to float if structure is 'f'
-            else:
-                cast_lst_message.append(int(lst_message[i]))  # cast to int otherwise
+        port, values, payload = pack_message(buffer_line)  # rejects malformed lines before packing
+        self.logger.debug("Sending over LoRa: " + str(values))
+        max_payload = self.get_payload_limit()
+
+        fmt = buffer_line.split(',', 3)[2]
+        if config.snapshot().lora_compact and is_compact(fmt):
+            compact_port, compact_payload, count = self.get_compact_details(fmt, values, max_payload)
+            if count > 1:
+                return compact_port, compact_payload, count
+
+        waiting = self.lora_buffer.size()
+
+        batch = [bytes([s.BATCH["fmt_version"]]), bytes([port]), payload]
+        batch_length = 2 + len(payload)
+        count = 1
+        while count < waiting:
+            try:
+                message_port, values, message_payload = pack_message(self.lora_buffer.read(offset=count))
+            except PayloadException:
+                break  # malformed message is dropped once it gets to the top of the stack
+            if batch_length + 1 + len(message_payload) > max_payload:
+                break
+            self.logger.debug("Sending over LoRa: " + str(values))
+            batch.append(bytes([message_port]))
+            batch.append(message_payload)
+            batch_length += 1 + len(message_payload)
+            count += 1
+
+        if count == 1:
+            return port, payload, count
+        return s.BATCH["port"], b''.join(batch), count
+
+    def get_compact_details(self, fmt, values, max_payload):
+        """
+        Delta encodes consecutive messages from the top of the lora stack that have the same format and sensor ids as
+        the message on top, up to the payload limit. Sensor ids are left out once acknowledged, except for every
+        ids_period-th compact payload, so that the back-end can recover them.
+        :param fmt: format of the message on top of the lora stack
+        :type fmt: str
+        :param values: fields of the message on top of the lora stack
+        :type values: list
+        :param max_payload: maximum payload size in bytes
+        :type max_payload: int
+        :return: port, payload, number of messages in the payload
+        :rtype: int, bytes, int
+        """
 
-        # pack payload
-        self.logger.debug("Sending over LoRa: " + str(cast_lst_message))
-        payload = struct.pack(structure, *cast_lst_message)  # define payload with given structure and list of averages
+        value_indices, id_indices = compact_indices(fmt)
+        ids = tuple(values[i] for i in id_indices)
+        ids_key = fmt + ':' + ','.join(str(i) for i in ids)
 
-        return port, payload
+        acked = config.get_config().get("lora_acked_ids") == ids_key
+        if acked and self.compact_payloads % s.COMPACT["ids_period"] != 0:
+            payload = compact_header(fmt)
+        else:
+            payload = compact_header(fmt, ids)
+        payload += compact_message(values, None, value_indices)
 
-    # removes messages from end of lora stack until they are all within a month
-    def check_date(self):
+        waiting = self.lora_buffer.size()
+        previous = values
+        count = 1
+        while count < waiting:
+            try:
+                message_fmt, message_values = cast_message(self.lora_buffer.read(offset=count))
+            except PayloadException:
+                break  # malformed message is dropped once it gets to the top of the stack
+            if message_fmt != fmt or tuple(message_values[i] for i in id_indices) != ids:
+                break
+            message = compact_message(message_values, previous, value_indices)
+            if len(payload) + len(message) > max_payload:
+                break
+            self.logger.debug("Sending over LoRa: " + str(message_values))
+            payload += message
+            previous = message_values
+            count += 1
+
+        if count > 1:  # a single message is sent on the port of its format instead
+            self.ids_key = ids_key
+            self.compact_payloads += 1
+        return s.COMPACT["port"], bytes(payload), count
+
+    def get_spreading_factor(self):
         """
-        Checks recursively if the message on the bottom of the stack is within a month
+        Gets the spreading factor used by the last uplink. Assumes the slowest data rate of the region before the first
+        uplink.
+        :return: spreading factor
+        :rtype: int
         """
 
-        buffer_line = self.lora_buffer.read(read_tail=True)  # read the tail of the lora_buffer
-        buffer_lst = buffer_line.split(',')  # convert string to a list of strings
-        time_now = time.gmtime()  # get current date
+        try:
+            sf = self.lora.stats().sftx
+        except Exception as e:
+            sf = None
+        if sf not in self.max_payload:
+            sf = max(self.max_payload)
+        return sf
+
+    def get_payload_limit(self):
+        """
+        Gets the maximum payload size for the data rate used by the last uplink, or for the slowest data rate of the
+        region if the last uplink failed, reduced so that the uplink does not use more than the air time left for the day
+        :return: maximum payload size in bytes
+        :rtype: int
+        """
 
-        # get year, month and minutes of the month now
-        year_now, month_now, minutes_now = time_now[0], time_now[1], minutes_of_the_month()
+        if self.send_failed:
+            sf = max(self.max_payload)
+        else:
+            sf = self.get_spreading_factor()
+        limit = self.max_payload[sf]
+        remaining_ms = self.daily_air_time_ms - self.air_time_used
+        if time_on_air_ms(limit, sf) > remaining_ms:
+            low, high = 0, limit  # largest payload that fits the remaining air time, by binary search
+            while low < high:
+                middle = (low + high + 1) // 2
+                if time_on_air_ms(middle, sf) <= remaining_ms:
+                    low = middle
+                else:
+                    high = middle - 1
+            limit = low
+        return limit
 
-        # get year, month and minutes of the month of the last message in the lora_buffer
-        year_then, month_then, minutes_then = int(buffer_lst[0]) + 2000, int(buffer_lst[1]), int(buffer_lst[4])
+    # removes messages from end of lora stack until they are all within a month
+    def check_date(self):
+        """
+        Removes all messages from the bottom of the stack that are not within a month in one step
+        """
 
-        # logic to decide if message is older than a month
-        if year_then < year_now or month_then < month_now:
-            if (month_then + 1 == month_now) or (month_then == 12 and month_now == 1 and year_then + 1 == year_now):
-                if minutes_then < minutes_now + 24*60:
-                    self.lora_buffer.remove_tail()  # remove message
-                    self.check_date()  # call recursively
-            else:
-                self.lora_buffer.remove_tail()  # remove message
-                self.check_date()  # call recursively
+        expired = self.lora_buffer.expire(month_expiry_cutoff())
+        if expired:
+            self.logger.info("Removed {} expired messages from the LoRa buffer".format(expired))
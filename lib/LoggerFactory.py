@@ -5,6 +5,17 @@ STATUS_FMT_DEFAULT = '%(levelname)s - %(asctime)s - %(name)s - %(message)s'
 STATUS_MAX_FILE_SIZE_DEFAULT = 10 * 1024 * 1024  # 10MiB
 STATUS_ARCHIVE_COUNT_DEFAULT = 10  # How many files to keep before deletion
 
+# writers of the log files of all status loggers, flushed before the device resets
+log_listeners = []
+
+
+def flush_logs():
+    """
+    Writes the records queued by all status loggers to their files, call before resetting the device
+    """
+    for listener in log_listeners:
+        listener.flush()
+
 
 class LoggerFactory:
     def __init__(
@@ -13,6 +24,7 @@ class LoggerFactory:
     ):
         self.path = path
         self.loggers = {}  # dictionary to store loggers
+        self.listeners = {}  # dictionary to store the writer of the log file of each logger
 
     def get_logger(self, name):
         """
@@ -35,7 +47,8 @@ class LoggerFactory:
             terminal_out=True
     ):
         """
-        Create status logger and add it to the self.loggers dictionary
+        Create status logger and add it to the self.loggers dictionary. Records are written to the file by a writer
+        thread, so that logging does not block the caller, the oldest records are dropped if the writer falls behind
         :param terminal_out: output status logger to terminal
         :type terminal_out: bool
         :param name: logger name
@@ -60,11 +73,23 @@ class LoggerFactory:
             status_logger.addHandler(sh)
         if filename:
             file_handler = handlers.RotatingFileHandler(self.path + filename, maxBytes=maxBytes, backupCount=backupCount)
-            file_handler.setFormatter(formatter)
-            status_logger.addHandler(file_handler)
+            queue_handler = handlers.QueueHandler()  # formats records and queues them for the writer thread
+            queue_handler.setFormatter(formatter)
+            listener = handlers.QueueListener(queue_handler, file_handler)
+            listener.start()
+            self.listeners[name] = listener
+            log_listeners.append(listener)
+            status_logger.addHandler(queue_handler)
         self.loggers[name] = status_logger
         return self.loggers[name]
 
+    def flush(self):
+        """
+        Writes the records queued by the status loggers of this factory to their files, call before resetting the device
+        """
+        for listener in self.listeners.values():
+            listener.flush()
+
     def set_level(self, name, level):
         """
         Set logging level
@@ -1,8 +1,8 @@
 from plantowerpycom import Plantower, PlantowerException
 from sensirionpycom import Sensirion, SensirionException
-from helper import mean_across_arrays, blink_led
+from helper import blink_led
 from Configuration import config
-from machine import Timer
+from TaskScheduler import scheduler
 from SensorLogger import SensorLogger
 import time
 
@@ -69,7 +69,9 @@ def pm_thread(sensor_name, status_logger, pins, serial_id):
                 blink_led((0x550000, 0.4, True))
 
     # start a periodic timer interrupt to poll readings every second
-    processing_alarm = Timer.Alarm(process_readings, arg=(sensor_type, sensor, sensor_logger, status_logger), s=1, periodic=True)
+    processing_alarm = scheduler.add(process_readings,
+                                     arg=(sensor_type, sensor, sensor_logger, status_logger), s=1,
+                                     periodic=True, name=sensor_name + " readings")
 
 
 def process_readings(args):
@@ -84,13 +86,17 @@ def process_readings(args):
     try:
         recv = sensor.read()
         if recv:
-            recv_lst = str(recv).split(',')
-            curr_timestamp = recv_lst[0]
-            sensor_reading_float = [float(i) for i in recv_lst[1:]]
-            sensor_reading_round = [round(i) for i in sensor_reading_float]
-            lst_to_log = [curr_timestamp] + [str(i) for i in sensor_reading_round]
-            line_to_log = ','.join(lst_to_log)
-            sensor_logger.log_row(line_to_log)
+            if sensor_logger.binary:
+                sensor_reading_round = [round(i) for i in recv.values()]
+                sensor_logger.log_sample(time.time(), sensor_reading_round)
+            else:
+                recv_lst = str(recv).split(',')
+                curr_timestamp = recv_lst[0]
+                sensor_reading_float = [float(i) for i in recv_lst[1:]]
+                sensor_reading_round = [round(i) for i in sensor_reading_float]
+                lst_to_log = [curr_timestamp] + [str(i) for i in sensor_reading_round]
+                line_to_log = ','.join(lst_to_log)
+                sensor_logger.log_row(line_to_log, sensor_reading_round)
     except Exception as e:
         status_logger.error("Failed to read from sensor {}".format(sensor_type))
         blink_led((0x550000, 0.4, True))
@@ -1,171 +1,457 @@
 import os
+import struct
+import time
 import _thread
 
+# Binary layout of the buffer file:
+# header (HEADER_SIZE bytes) - magic / version / reserved / cell_size / cell_number / head / tail / count / padding
+# cells (cell_number * cell_size bytes) - each cell is a timestamp and a length prefix followed by the encoded line
+MAGIC = b'RBUF'
+VERSION = 2
+HEADER_FORMAT = '<4sBBHIIII'
+HEADER_SIZE = 32  # header is padded, so that new fields can be added without moving the cells
+POINTERS_ADDRESS = 12  # head, tail and count are stored next to each other, so they can be saved with a single write
+POINTERS_FORMAT = '<III'
+CELL_HEADER_FORMAT = '<IH'  # timestamp (seconds since epoch), length of line
+CELL_HEADER_SIZE = 6
+V1_LENGTH_FORMAT = '<H'  # version 1 cells only had a length prefix
+V1_LENGTH_SIZE = 2
+PROVISION_CHUNK_SIZE = 4096  # size of zeroed chunks written when the buffer file is created or extended
+
+LEGACY_SUFFIX = '.old'  # buffer files in an older layout are renamed to this while being migrated
+
 
 class RingBuffer:
 
-    def __init__(self, logger, path, file_name, cell_number, cell_size):
+    def __init__(self, logger, path, file_name, cell_number, cell_size, get_timestamp=None):
+        """
+        Circular buffer of lines stored in a binary file on the SD card. The file is kept open for the lifetime of the
+        buffer, head and tail are kept as cell indices and saved in the header along with the number of stored lines
+        after every change. Every line is stored with the time it was written, so that expired lines can be found by
+        binary search.
+        :param logger: status logger
+        :type logger: LoggerFactory object
+        :param path: path to the directory of the buffer file, ending with '/'
+        :type path: str
+        :param file_name: name of the buffer file
+        :type file_name: str
+        :param cell_number: number of cells in the buffer
+        :type cell_number: int
+        :param cell_size: size of a cell in bytes including the timestamp and the length prefix
+        :type cell_size: int
+        :param get_timestamp: function returning the timestamp of a line migrated from a layout without timestamps,
+        time of migration is used if None
+        :type get_timestamp: function
+        """
 
         self.logger = logger
         self.file_path = path + file_name
         self.cell_number = cell_number
         self.cell_size = cell_size
+        self.get_timestamp = get_timestamp
 
-        self.size_address = 0
-        self.head_address = 1 * self.cell_size
-        self.tail_address = 2 * self.cell_size
-        self.buffer_start = 3 * self.cell_size
-        self.buffer_end = (self.cell_number + 3) * self.cell_size
-
-        self.head = self.buffer_start
-        self.tail = self.buffer_start
+        self.head = 0
+        self.tail = 0
+        self.count = 0
+        self.file = None
 
         self.buffer_lock = _thread.allocate_lock()
 
         with self.buffer_lock:
-            if file_name not in os.listdir(path[:-1]):  # if file does not exist, create one with details
+            file_list = os.listdir(path[:-1])
+            if file_name + LEGACY_SUFFIX in file_list:  # migration was interrupted, start it again
+                self._migrate()
+            elif file_name not in file_list:  # if file does not exist, create one with details
                 self.logger.error("Cannot find buffer file")
                 self.make_file()
             else:
                 try:
-                    if os.stat(self.file_path)[6] < (self.cell_number + 3) * self.cell_size:  # if file is too small
-                        self.logger.error("Buffer parameters are incorrect")
-                        self.make_file()
-                    with open(self.file_path, 'r+b') as f:
-
-                        # Check if file has the right dimensions
-                        f.seek(self.size_address)
-                        buffer_line = f.read(self.cell_size).decode()
-                        index = buffer_line.find("\n")
-                        if index == -1:
-                            self.logger.error("Buffer parameters are incorrect")
-                            self.make_file()
-                        else:
-                            size_lst = buffer_line[:index].split(',')
-                            if int(size_lst[0]) != self.cell_number or int(size_lst[1]) != self.cell_size:
-                                self.logger.error("Buffer parameters are incorrect")
-                                self.make_file()
-
-                        # Get current head
-                        f.seek(self.head_address)
-                        buffer_line = f.read(self.cell_size).decode()
-                        index = buffer_line.find("\n")
-                        if index == -1:
-                            self.logger.error("Buffer parameters are incorrect")
-                            self.make_file()
-                        else:
-                            self.head = int(buffer_line[:index])
-
-                        # Get current tail
-                        f.seek(self.tail_address)
-                        buffer_line = f.read(self.cell_size).decode()
-                        index = buffer_line.find("\n")
-                        if index == -1:
-                            self.logger.error("Buffer parameters are incorrect")
-                            self.make_file()
-                        else:
-                            self.tail = int(buffer_line[:index])
-
+                    self._open()
                 except Exception as e:
                     self.logger.exception("Buffer file is corrupted")
                     self.make_file()
 
+    def _open(self):
+        """
+        Opens the buffer file and loads head and tail from its header. Files in an older layout are migrated.
+        """
+
+        f = open(self.file_path, 'r+b')
+        header = f.read(HEADER_SIZE)
+
+        if header[:len(MAGIC)] != MAGIC or struct.unpack_from(HEADER_FORMAT, header)[1] != VERSION:
+            f.close()
+            self.logger.warning("Converting buffer file to the current format")
+            os.rename(self.file_path, self.file_path + LEGACY_SUFFIX)
+            self._migrate()
+            return
+
+        magic, version, reserved, cell_size, cell_number, head, tail, count = struct.unpack_from(HEADER_FORMAT, header)
+        if cell_size != self.cell_size or head >= cell_number or tail >= cell_number \
+                or os.stat(self.file_path)[6] < HEADER_SIZE + cell_number * cell_size:
+            f.close()
+            self.logger.error("Buffer parameters are incorrect")
+            self.make_file()
+            return
+
+        requested_cell_number = self.cell_number
+        self.file = f
+        self.cell_number = cell_number
+        self.head = head
+        self.tail = tail
+        self.count = count
+        self._check()
+
+        # keep queued lines if only the number of cells has changed
+        self._resize(requested_cell_number)
+
+    def close(self):
+        with self.buffer_lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
     def make_file(self):
         self.logger.info("Flashing new buffer file...")
         self.logger.info("This can take a while, please do not turn off")
 
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
         try:
             os.remove(self.file_path)
         except Exception as e:
             pass
 
+        self.head = 0
+        self.tail = 0
+        self.count = 0
+
         with open(self.file_path, 'wb') as f:
-            for val in range(self.cell_number + 3):
-                f.write((self.cell_size * "0").encode())
-            f.seek(self.size_address)
-            f.write((str(self.cell_number) + ',' + str(self.cell_size) + "\n").encode())
-            f.seek(self.head_address)
-            f.write((str(self.head) + "\n").encode())
-            f.seek(self.tail_address)
-            f.write((str(self.tail) + "\n").encode())
-
-    def write(self, line):  # writes line at head
+            f.write(self._pack_header())
+            self._provision(f, self.cell_number)
+
+        self.file = open(self.file_path, 'r+b')
+
+    def _pack_header(self):
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, 0, self.cell_size, self.cell_number, self.head, self.tail,
+                             self.count)
+        return header + bytes(HEADER_SIZE - len(header))
+
+    def _provision(self, f, cell_number):
+        """
+        Appends empty cells to the buffer file in large chunks, so that provisioning takes a few hundred writes
+        rather than one write per cell. Only the length prefix of a cell is ever trusted, and only between tail and
+        head, so the content of new cells does not matter.
+        :param f: buffer file positioned at its end
+        :param cell_number: number of cells to append
+        :type cell_number: int
+        """
+
+        remaining = cell_number * self.cell_size
+        chunk = bytearray(min(PROVISION_CHUNK_SIZE, remaining))
+        chunk_view = memoryview(chunk)
+        while remaining > 0:
+            if remaining >= len(chunk):
+                f.write(chunk)
+                remaining -= len(chunk)
+            else:
+                f.write(chunk_view[:remaining])
+                remaining = 0
+
+    def _migrate(self):
+        """
+        Copies lines from a buffer file in an older layout into a new buffer file. Oldest lines are copied first. Lines
+        that cannot be copied are skipped, lines whose time cannot be read are stored with the time of migration. The
+        old file is only removed once all of its lines were read, so that the migration starts again after a reset.
+        """
+
+        legacy_path = self.file_path + LEGACY_SUFFIX
+        self.make_file()
+
+        skipped = 0
+        try:
+            with open(legacy_path, 'rb') as old:
+                for data in _legacy_lines(old):
+                    try:
+                        data.decode()  # a line that cannot be decoded could never be read back
+                        self._push(data, self._legacy_timestamp(data))
+                    except Exception as e:
+                        skipped += 1
+        except Exception as e:
+            self._save_pointers()
+            self.logger.exception("Failed to migrate buffer file, {} messages copied".format(self.size()))
+            return
+
+        self._save_pointers()
+        self.logger.info("Migrated {} messages to the new buffer file".format(self.size()))
+        if skipped:
+            self.logger.warning("Skipped {} messages that could not be migrated".format(skipped))
+
+        try:
+            os.remove(legacy_path)
+        except Exception as e:
+            pass
+
+    def _legacy_timestamp(self, data):
+        """
+        :param data: encoded line from a buffer file in an older layout
+        :type data: bytes
+        :return: time of the line, time of migration if it cannot be read from the line
+        :rtype: int
+        """
+
+        if self.get_timestamp is not None:
+            try:
+                return self.get_timestamp(data.decode())
+            except Exception as e:
+                pass
+        return time.time()
+
+    def resize(self, cell_number):
+        """
+        Changes the number of cells in place, keeping queued lines. If the buffer shrinks below the number of queued
+        lines, the oldest lines are dropped.
+        :param cell_number: new number of cells
+        :type cell_number: int
+        """
+
         with self.buffer_lock:
-            with open(self.file_path, 'r+b') as f:
-                f.seek(self.head)
-                f.write((line + "\n").encode())  # write line
+            self._resize(cell_number)
 
-        # check if buffer reached around
-        next_head = self.head + self.cell_size
-        if next_head >= self.buffer_end:
-            next_head = self.buffer_start  # loop around if end is reached
-        if next_head == self.tail:
-            self.remove_tail()
+    def _resize(self, cell_number):
+        old_cell_number = self.cell_number
+        if cell_number == old_cell_number:
+            return
 
+        self.logger.info("Resizing buffer from {} to {} cells".format(old_cell_number, cell_number))
+
+        if cell_number > old_cell_number:  # extend file before moving lines into new cells
+            self.file.seek(self._cell_address(old_cell_number))
+            self._provision(self.file, cell_number - old_cell_number)
+
+        # drop oldest lines that do not fit
+        keep = min(self.count, cell_number - 1)
+        self.tail = (self.tail + self.count - keep) % old_cell_number
+        self.count = keep
+
+        if self.count == 0:
+            self.head = 0
+            self.tail = 0
+        elif self.tail < self.head:  # lines are in one block
+            if self.head > cell_number - 1:  # move the block to the beginning
+                for i in range(self.count):
+                    self._copy_cell(self.tail + i, i)
+                self.tail = 0
+                self.head = self.count
+        else:  # lines wrap around, move the block between tail and the old end to the new end
+            block_length = old_cell_number - self.tail
+            new_tail = cell_number - block_length
+            if new_tail > self.tail:
+                indices = range(block_length - 1, -1, -1)  # copy from the back when moving towards the end
+            else:
+                indices = range(block_length)
+            for i in indices:
+                self._copy_cell(self.tail + i, new_tail + i)
+            self.tail = new_tail
+
+        self.cell_number = cell_number
+        self.file.seek(0)
+        self.file.write(self._pack_header())
+        self.file.flush()
+
+    def _copy_cell(self, source, destination):
+        self.file.seek(self._cell_address(source))
+        buffer_cell = self.file.read(self.cell_size)
+        self.file.seek(self._cell_address(destination))
+        self.file.write(buffer_cell)
+
+    def _cell_address(self, index):
+        return HEADER_SIZE + index * self.cell_size
+
+    def _save_pointers(self):
+        self.file.seek(POINTERS_ADDRESS)
+        self.file.write(struct.pack(POINTERS_FORMAT, self.head, self.tail, self.count))
+        self.file.flush()
+
+    def _check(self):
+        """
+        Rebuilds the number of stored lines from head and tail if it does not match, e.g. after a crash or for files
+        written before the count was stored. The buffer lock has to be held by the caller.
+        :return: True if the stored count was consistent
+        :rtype: bool
+        """
+
+        count = (self.head - self.tail) % self.cell_number
+        if count == self.count:
+            return True
+        self.logger.warning("Buffer count is inconsistent, rebuilding it from head and tail")
+        self.count = count
+        self._save_pointers()
+        return False
+
+    def check(self):
         with self.buffer_lock:
-            with open(self.file_path, 'r+b') as f:
-                self.head += self.cell_size  # increment head
-                if self.head >= self.buffer_end:
-                    self.head = self.buffer_start  # loop around if end is reached
-                f.seek(self.head_address)
-                f.write((str(self.head) + "\n").encode())  # save new head
-
-    def read(self, read_tail=False):  # reads line at head or tail
-        if self.tail is not self.head:  # if buffer is empty do not read line
-            with self.buffer_lock:
-                with open(self.file_path, 'r+b') as f:
-                    if read_tail:
-                        f.seek(self.tail)
-                    else:
-                        if self.head == self.buffer_start:
-                            f.seek(self.buffer_end - self.cell_size)
-                        else:
-                            f.seek(self.head - self.cell_size)
-                    buffer_line = f.read(self.cell_size).decode()
-                    index = buffer_line.find("\n")
-                    if index == -1:
-                        raise Exception("Data not found")
-                    return buffer_line[:index]
-        else:
-            raise Exception("Buffer is empty")
-
-    def remove_head(self):
-        if self.tail is not self.head:  # if buffer is empty do not remove cell
-            with self.buffer_lock:
-                with open(self.file_path, 'r+b') as f:
-                    self.head -= self.cell_size  # decrement head
-                    if self.head < self.buffer_start:  # loop around if beginning is reached
-                        self.head = self.buffer_end - self.cell_size
-                    f.seek(self.head_address)
-                    f.write((str(self.head) + "\n").encode())
+            return self._check()
+
+    def _push(self, data, timestamp):
+        """
+        Writes encoded line at head and moves head forward, dropping the tail if the buffer is full. Pointers are not
+        saved and the buffer lock has to be held by the caller.
+        """
+
+        if len(data) > self.cell_size - CELL_HEADER_SIZE:
+            raise Exception("Line is too long for the buffer")
+
+        self.file.seek(self._cell_address(self.head))
+        self.file.write(struct.pack(CELL_HEADER_FORMAT, int(timestamp), len(data)) + data)
+
+        self.head = (self.head + 1) % self.cell_number  # loop around if end is reached
+        if self.head == self.tail:  # buffer reached around - drop oldest line
+            self.tail = (self.tail + 1) % self.cell_number
         else:
-            raise Exception("Buffer is empty")
+            self.count += 1
+
+    def _read_cell(self, index):
+        self.file.seek(self._cell_address(index))
+        buffer_cell = self.file.read(self.cell_size)
+        length = struct.unpack_from(CELL_HEADER_FORMAT, buffer_cell)[1]
+        if length > self.cell_size - CELL_HEADER_SIZE:
+            raise Exception("Data not found")
+        return buffer_cell[CELL_HEADER_SIZE:CELL_HEADER_SIZE + length].decode()
+
+    def _read_timestamp(self, index):
+        self.file.seek(self._cell_address(index))
+        return struct.unpack(CELL_HEADER_FORMAT, self.file.read(CELL_HEADER_SIZE))[0]
+
+    def write(self, line, timestamp=None):  # writes line at head
+        """
+        :param line: line to store, a trailing new line is stripped
+        :type line: str
+        :param timestamp: time of the line in seconds since epoch, current time if None
+        :type timestamp: int
+        """
+        data = line.rstrip('\n').encode()
+        if timestamp is None:
+            timestamp = time.time()
+        with self.buffer_lock:
+            self._push(data, timestamp)
+            self._save_pointers()  # save new head (and tail if it was dropped)
+
+    def read(self, read_tail=False, offset=0):  # reads line at head or tail
+        """
+        :param read_tail: read from the tail (oldest line) instead of the head (newest line)
+        :type read_tail: bool
+        :param offset: number of lines to skip from the head or the tail
+        :type offset: int
+        :return: line
+        :rtype: str
+        """
+        with self.buffer_lock:
+            if offset >= self.count:  # if buffer is empty do not read line
+                raise Exception("Buffer is empty")
+            if read_tail:
+                return self._read_cell((self.tail + offset) % self.cell_number)
+            return self._read_cell((self.head - 1 - offset) % self.cell_number)
+
+    def remove_head(self, count=1):
+        """
+        :param count: number of lines to remove from the head
+        :type count: int
+        """
+        with self.buffer_lock:
+            if count > self.count:  # if buffer is empty do not remove cell
+                raise Exception("Buffer is empty")
+            self.head = (self.head - count) % self.cell_number  # decrement head, loop around if beginning is reached
+            self.count -= count
+            self._save_pointers()
+
+    def expire(self, cutoff):
+        """
+        Removes all lines written before cutoff from the tail with a single pointer update. Lines are in time order,
+        so the first line to keep is found by binary search over the stored timestamps.
+        :param cutoff: lines with timestamps older than this are removed (seconds since epoch)
+        :type cutoff: int
+        :return: number of lines removed
+        :rtype: int
+        """
+
+        with self.buffer_lock:
+            low, high = 0, self.count
+            while low < high:
+                middle = (low + high) // 2
+                if self._read_timestamp((self.tail + middle) % self.cell_number) < cutoff:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low > 0:
+                self.tail = (self.tail + low) % self.cell_number
+                self.count -= low
+                self._save_pointers()
+            return low
 
     def remove_tail(self):
-        if self.tail is not self.head:  # if buffer is empty do not remove cell
-            with self.buffer_lock:
-                with open(self.file_path, 'r+b') as f:
-                    self.tail += self.cell_size  # increment tail
-                    if self.tail >= self.buffer_end:  # loop around if beginning is reached
-                        self.tail = self.buffer_start
-                    f.seek(self.tail_address)
-                    f.write((str(self.tail) + "\n").encode())
-        else:
-            raise Exception("Buffer is empty")
+        with self.buffer_lock:
+            if self.tail == self.head:  # if buffer is empty do not remove cell
+                raise Exception("Buffer is empty")
+            self.tail = (self.tail + 1) % self.cell_number  # increment tail, loop around if end is reached
+            self.count -= 1
+            self._save_pointers()
 
     def size(self, up_to=False):
-        if not up_to:
-            up_to = self.cell_number
+        """
+        :param up_to: maximum number to return, counts all lines if False
+        :type up_to: int
+        :return: number of lines stored in the buffer
+        :rtype: int
+        """
+        if up_to and self.count > up_to:
+            return up_to
+        return self.count
+
+
+def _legacy_lines(f):
+    """
+    Yields encoded lines from a buffer file in an older layout, oldest first
+    :param f: buffer file opened for reading
+    """
+
+    header = f.read(HEADER_SIZE)
+
+    if header[:len(MAGIC)] == MAGIC:  # version 1 - binary cells with a length prefix only
+        magic, version, reserved, cell_size, cell_number, head, tail, count = struct.unpack_from(HEADER_FORMAT, header)
+        index = tail
+        while index != head:
+            f.seek(HEADER_SIZE + index * cell_size)
+            buffer_cell = f.read(cell_size)
+            length = struct.unpack_from(V1_LENGTH_FORMAT, buffer_cell)[0]
+            if length <= cell_size - V1_LENGTH_SIZE:
+                yield buffer_cell[V1_LENGTH_SIZE:V1_LENGTH_SIZE + length]
+            index = (index + 1) % cell_number
+        return
 
-        count = 0
+    # ASCII layout - first three cells held size, head and tail as text terminated by a new line
+    size_lst = header[:header.find(b'\n')].decode().split(',')
+    cell_number, cell_size = int(size_lst[0]), int(size_lst[1])
+    buffer_start = 3 * cell_size
+    buffer_end = (cell_number + 3) * cell_size
 
-        if self.tail is not self.head:  # if buffer is empty do not count
-            while True:
-                count += 1
-                head_index = self.head - count * self.cell_size  # decrement cell by cell
-                if head_index < self.buffer_start:
-                    head_index = self.buffer_end - self.cell_size  # loop around
-                if head_index == self.tail or count == up_to:  # if end of buffer or certain amount is found, then break
-                    break
+    f.seek(cell_size)
+    buffer_line = f.read(cell_size)
+    head = int(buffer_line[:buffer_line.find(b'\n')])
+    f.seek(2 * cell_size)
+    buffer_line = f.read(cell_size)
+    position = int(buffer_line[:buffer_line.find(b'\n')])
 
-        return count
+    count = 0
+    while position != head and count < cell_number:
+        f.seek(position)
+        buffer_line = f.read(cell_size)
+        index = buffer_line.find(b'\n')
+        if index != -1:
+            yield buffer_line[:index]
+        count += 1
+        position += cell_size
+        if position >= buffer_end:
+            position = buffer_start  # loop around if end is reached
@@ -0,0 +1,78 @@
+"""
+Running averages of sensor readings, fed from the reading path and taken by the event scheduler every interval
+"""
+from Configuration import config
+import strings as s
+
+
+class RunningAverage:
+    def __init__(self, sensor_type):
+        """
+        Keeps running sums, counts, minima and maxima of the columns of a sensor that are sent over LoRa
+        :param sensor_type: type of the sensor, e.g. PMS5003 or SHT35
+        :type sensor_type: str
+        """
+
+        headers = s.headers_dict_v4[sensor_type][1:]  # readings do not contain the timestamp
+        self.indices = [headers.index(header) for header in s.lora_sensor_headers[sensor_type]]
+        columns = len(self.indices)
+        self.sums = [0] * columns
+        self.counts = [0] * columns
+        self.minimum = [0] * columns
+        self.maximum = [0] * columns
+        self.samples = 0
+
+    def add(self, reading):
+        """
+        Adds a reading to the running sums. current_lock has to be held, so that the reading is counted in the
+        interval of the sensor file its row is written to.
+        :param reading: values of a reading in the order of the sensor headers, without the timestamp
+        :type reading: list of int
+        """
+
+        self.samples += 1
+        for column, index in enumerate(self.indices):
+            value = reading[index]
+            if self.counts[column] == 0:
+                self.minimum[column] = value
+                self.maximum[column] = value
+            elif value < self.minimum[column]:
+                self.minimum[column] = value
+            elif value > self.maximum[column]:
+                self.maximum[column] = value
+            self.sums[column] += value
+            self.counts[column] += 1
+
+    def snapshot(self):
+        """
+        Takes the averages of the readings added since the last snapshot and starts a new interval. current_lock has
+        to be held, so that the interval matches the sensor file that is moved to processing.
+        :return: averages, number of readings, minima, maxima
+        :rtype: list of int, int, list of int, list of int
+        """
+
+        averages = [int(self.sums[i] / self.counts[i]) if self.counts[i] else 0 for i in range(len(self.sums))]
+        result = averages, self.samples, list(self.minimum), list(self.maximum)
+        for i in range(len(self.sums)):
+            self.sums[i] = 0
+            self.counts[i] = 0
+        self.samples = 0
+        return result
+
+
+# running averages of the sensors by sensor name (PM1, PM2 or TEMP)
+running_averages = {}
+
+
+def get_running_average(sensor_name):
+    """
+    Gets the running average of a sensor, created on first use for the sensor type in the configuration
+    :param sensor_name: PM1, PM2 or TEMP
+    :type sensor_name: str
+    :return: running average of the sensor
+    :rtype: RunningAverage object
+    """
+
+    if sensor_name not in running_averages:
+        running_averages[sensor_name] = RunningAverage(config.get_config(sensor_name))
+    return running_averages[sensor_name]
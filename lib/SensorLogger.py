@@ -2,14 +2,22 @@
 Simple logger for logging sensor readings.
 Replaces the functionality of the sensor logger that was previously produced by the LoggerFactory
 """
+import os
 import sys
 from helper import current_lock
+from TaskScheduler import scheduler
+from RunningAverage import get_running_average
+from Configuration import config
+from sample_log import encode_header, encode_sample
 import strings as s
 
 
 class SensorLogger:
     def __init__(self, sensor_name, terminal_out=True, terminator='\n'):
         """
+        Buffers rows in RAM and appends them to the current file of the sensor once the buffer exceeds
+        s.sensor_flush_bytes, every flush period or when the file is moved to processing. Readings are added to the
+        running average of the sensor along with their rows, so that both belong to the same interval
         :param sensor_name: sensor name
         :type sensor_name: str
         :param terminal_out: print output to terminal
@@ -17,15 +25,131 @@ class SensorLogger:
         :param terminator: end of line character
         :type terminator: object
         """
-        self.filename = s.current_path + sensor_name + '.csv'
+        self.binary = sample_format_binary()
+        self.filename = s.current_path + sensor_name + sample_extension()
         self.terminal_out = terminal_out
         self.terminator = terminator
         self.sensor_name = sensor_name
+        self.running_average = get_running_average(sensor_name)
+        self.flush_ms = int(float(config.get_config().get("sensor_flush_s", s.sensor_flush_s)) * 1000)
 
-    def log_row(self, row):
+        if self.binary:
+            self.sensor_type = config.get_config(sensor_name)
+            self.structure = s.sample_structures[self.sensor_type]
+
+        self.rows = []
+        self.buffered = 0  # bytes in rows
+
+        # statistics
+        self.flushes = 0
+        self.bytes_written = 0
+
+        sensor_loggers[sensor_name] = self
+
+        # rows are written within a flush period, also if the sensor logs less often or stops logging
+        self.flush_task = scheduler.add(self._flush_handler, ms=self.flush_ms, periodic=True,
+                                        name=sensor_name + " flush")
+
+    def log_row(self, row, reading):
+        """
+        Logs a reading as a csv row
+        :param row: timestamp and readings separated by commas
+        :type row: str
+        :param reading: readings of the row in the order of the sensor headers, without the timestamp
+        :type reading: list of int
+        """
         row_to_log = row + self.terminator
         if self.terminal_out:
             sys.stdout.write(self.sensor_name + " - " + row_to_log)
+        self._buffer(row_to_log, reading)
+
+    def log_sample(self, epoch, values):
+        """
+        Logs a reading as a binary record
+        :param epoch: time of the reading in seconds since epoch
+        :type epoch: int
+        :param values: readings in the order of the sensor headers, without the timestamp
+        :type values: list of int
+        """
+        if self.terminal_out:
+            row = ','.join([str(epoch)] + [str(value) for value in values])
+            sys.stdout.write(self.sensor_name + " - " + row + self.terminator)
+        self._buffer(encode_sample(self.structure, epoch, values), values)
+
+    def _buffer(self, row_to_log, reading):
         with current_lock:
+            self.running_average.add(reading)
+            self.rows.append(row_to_log)
+            self.buffered += len(row_to_log)
+            if self.buffered >= s.sensor_flush_bytes:
+                self._flush()
+
+    def _flush_handler(self, arg):
+        self.flush()
+
+    def flush(self):
+        """
+        Writes buffered rows to the current file of the sensor
+        """
+        with current_lock:
+            self._flush()
+
+    def _flush(self):
+        """
+        Writes buffered rows to the current file of the sensor. current_lock has to be held.
+        """
+        if not self.rows:
+            return
+        if self.binary:
+            rows = b''.join(self.rows)
+        else:
+            rows = ''.join(self.rows)
+        self.rows = []  # rows are dropped if writing fails, so that the buffer does not grow while the SD card fails
+        self.buffered = 0
+        if self.binary:
+            try:
+                new_file = os.stat(self.filename)[6] == 0
+            except OSError:
+                new_file = True
+            with open(self.filename, 'ab') as f:
+                if new_file:
+                    f.write(encode_header(self.sensor_type))
+                f.write(rows)
+        else:
             with open(self.filename, 'a') as f:
-                f.write(row_to_log)
+                f.write(rows)
+        self.flushes += 1
+        self.bytes_written += len(rows)
+
+
+# sensor loggers by sensor name, so that buffered rows can be flushed before the current file is moved
+sensor_loggers = {}
+
+
+def flush_sensor_rows(sensor_name):
+    """
+    Writes buffered rows of a sensor to its current file, current_lock has to be held.
+    :param sensor_name: PM1, PM2 or TEMP
+    :type sensor_name: str
+    """
+
+    if sensor_name in sensor_loggers:
+        sensor_loggers[sensor_name]._flush()
+
+
+def sample_format_binary():
+    """
+    :return: True if readings are logged as binary records, False if as csv
+    :rtype: bool
+    """
+
+    return config.get_config().get("sample_format", s.sample_format) == "binary"
+
+
+def sample_extension():
+    """
+    :return: extension of the files of sensor readings in the current dir and the archive
+    :rtype: str
+    """
+
+    return s.binary_extension if sample_format_binary() else s.csv_extension
@@ -0,0 +1,175 @@
+from machine import Timer
+import time
+import sys
+import _thread
+
+MERGE_WINDOW_MS = 20  # tasks due within this window are dispatched in the same wakeup
+ALIGN_MS = 1000  # periodic tasks with a period divisible by this are aligned to it, so that their deadlines coincide
+
+
+class Task:
+    def __init__(self, scheduler, handler, period_ms, arg, name):
+        """
+        Scheduled call of a handler, returned by TaskScheduler.add
+        :param scheduler: scheduler the task belongs to
+        :type scheduler: TaskScheduler object
+        :param handler: function to call with arg
+        :type handler: function
+        :param period_ms: period in milliseconds, 0 if the task runs only once
+        :type period_ms: int
+        :param arg: argument passed to the handler, the task itself if None (like Timer.Alarm)
+        :type arg: any
+        :param name: name of the task in reports
+        :type name: str
+        """
+
+        self.scheduler = scheduler
+        self.handler = handler
+        self.period_ms = period_ms
+        self.arg = self if arg is None else arg
+        self.name = name
+        self.deadline = 0
+        self.active = True
+
+        # statistics
+        self.runs = 0
+        self.overruns = 0  # number of periods skipped, because the task was dispatched too late
+        self.max_lateness_ms = 0
+        self.max_run_ms = 0
+
+    def cancel(self):
+        self.scheduler.cancel(self)
+
+
+class TaskScheduler:
+    def __init__(self):
+        """
+        Dispatches all timed tasks from a single one-shot alarm, which is re-armed for the earliest deadline. Tasks are
+        kept in a list sorted by deadline.
+        """
+
+        self.tasks = []
+        self.lock = _thread.allocate_lock()
+        self.alarm = None
+        self.alarm_deadline = 0
+        self.dispatching = False
+
+    def add(self, handler, s=0, ms=0, arg=None, periodic=False, name="task"):
+        """
+        Schedules a handler, takes the same arguments as Timer.Alarm
+        :param handler: function to call with arg
+        :type handler: function
+        :param s: seconds until the task is due, and its period if periodic
+        :type s: float
+        :param ms: milliseconds added to s
+        :type ms: int
+        :param arg: argument passed to the handler, the task itself if None
+        :type arg: any
+        :param periodic: True if the task repeats
+        :type periodic: bool
+        :param name: name of the task in reports
+        :type name: str
+        :return: task that can be cancelled
+        :rtype: Task object
+        """
+
+        delay_ms = int(s * 1000) + ms
+        task = Task(self, handler, delay_ms if periodic else 0, arg, name)
+        now = time.ticks_ms()
+        task.deadline = time.ticks_add(now, delay_ms)
+        if periodic and delay_ms % ALIGN_MS == 0:
+            task.deadline = time.ticks_add(task.deadline, ALIGN_MS - task.deadline % ALIGN_MS)
+
+        with self.lock:
+            self._insert(task)
+            self._rearm(now)
+        return task
+
+    def cancel(self, task):
+        with self.lock:
+            task.active = False
+            if task in self.tasks:
+                self.tasks.remove(task)
+
+    def _insert(self, task):
+        index = len(self.tasks)
+        while index > 0 and time.ticks_diff(self.tasks[index - 1].deadline, task.deadline) > 0:
+            index -= 1
+        self.tasks.insert(index, task)
+
+    def _rearm(self, now):
+        """
+        Arms the alarm for the earliest deadline if it is not already armed for an earlier one. Lock has to be held.
+        """
+
+        if self.dispatching or not self.tasks:  # alarm is re-armed once dispatching finished
+            return
+        deadline = self.tasks[0].deadline
+        if self.alarm is not None:
+            if time.ticks_diff(deadline, self.alarm_deadline) >= 0:
+                return
+            self.alarm.cancel()
+        self.alarm_deadline = deadline
+        self.alarm = Timer.Alarm(self._dispatch, ms=max(time.ticks_diff(deadline, now), 1), periodic=False)
+
+    def _dispatch(self, alarm):
+        """
+        Runs all tasks that are due or due within the merge window, then re-arms the alarm
+        """
+
+        with self.lock:
+            self.alarm = None
+            self.dispatching = True
+
+        while True:
+            now = time.ticks_ms()
+            with self.lock:
+                if not self.tasks or time.ticks_diff(self.tasks[0].deadline, now) > MERGE_WINDOW_MS:
+                    self.dispatching = False
+                    self._rearm(now)
+                    return
+                task = self.tasks.pop(0)
+                lateness = time.ticks_diff(now, task.deadline)
+                if task.period_ms:
+                    task.deadline = time.ticks_add(task.deadline, task.period_ms)
+                    if time.ticks_diff(task.deadline, now) <= 0:  # skip periods that were missed
+                        missed = time.ticks_diff(now, task.deadline) // task.period_ms + 1
+                        task.deadline = time.ticks_add(task.deadline, missed * task.period_ms)
+                        task.overruns += missed
+                    self._insert(task)
+                else:
+                    task.active = False
+
+            if lateness > task.max_lateness_ms:
+                task.max_lateness_ms = lateness
+            task.runs += 1
+            try:
+                task.handler(task.arg)
+            except Exception as e:
+                sys.print_exception(e)
+            run_ms = time.ticks_diff(time.ticks_ms(), now)
+            if run_ms > task.max_run_ms:
+                task.max_run_ms = run_ms
+
+    def log_report(self, logger):
+        """
+        Logs statistics of the scheduled tasks and resets the maximum lateness and run time
+        :param logger: status logger
+        :type logger: LoggerFactory object
+        """
+
+        with self.lock:
+            tasks = list(self.tasks)
+        for task in tasks:
+            message = "Task {} - runs: {}, max lateness: {} ms, max run time: {} ms, overruns: {}".format(
+                task.name, task.runs, task.max_lateness_ms, task.max_run_ms, task.overruns)
+            if task.period_ms and task.max_run_ms > task.period_ms:
+                logger.warning(message)
+            else:
+                logger.debug(message)
+            task.max_lateness_ms = 0
+            task.max_run_ms = 0
+
+
+# global scheduler for timed tasks
+scheduler = TaskScheduler()
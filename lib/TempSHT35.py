@@ -1,8 +1,31 @@
-from machine import I2C, Timer
+from machine import I2C
+from TaskScheduler import scheduler
 from Configuration import config
 from helper import blink_led
+from checksum import check_words
 from strings import csv_timestamp_template
 import time
+import _thread
+
+# Periodic acquisition modes with high repeatability, (measurements per second, command)
+PERIODIC_MODES = ((0.5, b'\x20\x32'), (1, b'\x21\x30'), (2, b'\x22\x36'), (4, b'\x23\x34'), (10, b'\x27\x37'))
+FETCH_DATA = b'\xe0\x00'  # read the last measurement of the periodic mode
+BREAK = b'\x30\x93'  # stop the periodic mode, so that another mode can be started
+
+
+def periodic_mode(period_s):
+    """
+    Picks the slowest periodic mode that measures at least twice per poll, so a new measurement is always ready
+    :param period_s: poll period in seconds
+    :type period_s: float
+    :return: measurements per second, command
+    :rtype: float, bytes
+    """
+
+    for mps, command in PERIODIC_MODES:
+        if mps * period_s >= 2:
+            return mps, command
+    return PERIODIC_MODES[-1]
 
 
 # Temp Res: 0.01C, Temp Acc: +/-0.1C, Humid Res: 0.01%, Humid Acc: +/-1.5%
@@ -16,29 +39,69 @@ class TempSHT35(object):
         # Initialise i2c - bus no., type, baudrate, i2c pins
         self.i2c = I2C(0, I2C.MASTER, baudrate=9600, pins=('P9', 'P10'))
         self.address = 0x45
+        self.data = bytearray(6)
+        self.i2c_lock = _thread.allocate_lock()  # polling and restarts with a new period run on different threads
+
+        # start periodic acquisition, so that polling only fetches the last measurement without waiting for it
+        # the sensor keeps power over a soft reset and may still be in periodic mode, which NACKs a new start command
+        period_s = int(config.get_config("TEMP_period"))
+        mps, command = periodic_mode(period_s)
+        self.start_periodic_mode(command)
+        time.sleep(1 / mps + 0.02)  # wait for the first measurement
 
         # get one sensor reading upon init to catch any errors and calibrate the sensor
         self.read()
         # start a periodic timer interrupt to poll readings at a frequency
-        self.processing_alarm = Timer.Alarm(self.process_readings, s=int(config.get_config("TEMP_period")), periodic=True)
+        self.processing_alarm = scheduler.add(self.process_readings, s=period_s, periodic=True, name="TEMP readings")
 
-    def read(self):
-        # high repeatability, clock stretching disabled
-        self.i2c.writeto_mem(self.address, 0x24, 0x00)
+        # change the poll period without a reboot
+        config.subscribe(("TEMP_period",), self.config_changed)
+
+    def config_changed(self, keys):
+        """
+        Restarts periodic acquisition and polling with the new period. Polling is restarted even if the sensor cannot
+        be, as the change does not reboot the device
+        :param keys: changed keys of the configuration
+        :type keys: list of str
+        """
+        period_s = int(config.get_config("TEMP_period"))
+        mps, command = periodic_mode(period_s)
+        try:
+            self.start_periodic_mode(command)
+        except Exception as e:
+            self.status_logger.exception("Failed to restart temperature sensor with a period of {}s".format(period_s))
+        finally:
+            self.processing_alarm.cancel()
+            self.processing_alarm = scheduler.add(self.process_readings, s=period_s, periodic=True,
+                                                  name="TEMP readings")
+
+    def start_periodic_mode(self, command):
+        """
+        Stops the periodic mode the sensor may be in, then starts the given one
+        :param command: command of the periodic mode
+        :type command: bytes
+        """
+
+        with self.i2c_lock:
+            self.i2c.writeto(self.address, BREAK)
+            time.sleep(0.002)  # sensor accepts commands 1 ms after the break command
+            self.i2c.writeto(self.address, command)
 
-        # measurement duration < 16 ms
-        time.sleep(0.016)
+    def read(self):
+        data = self.data
+        with self.i2c_lock:
+            # fetch the last measurement of the periodic mode
+            self.i2c.writeto(self.address, FETCH_DATA)
 
-        # read 6 bytes back
-        # Temp MSB, Temp LSB, Temp CRC, Humidity MSB, Humidity LSB, Humidity CRC
-        data = self.i2c.readfrom_mem(self.address, 0x00, 6)
+            # read 6 bytes back
+            # Temp MSB, Temp LSB, Temp CRC, Humidity MSB, Humidity LSB, Humidity CRC
+            self.i2c.readfrom_into(self.address, data)
         temperature = data[0] * 256 + data[1]
         celsius = -45 + (175 * temperature / 65535.0)
         humidity = 100 * (data[3] * 256 + data[4]) / 65535.0
-        if data[2] != CRC(data[:2]):
-            raise RuntimeError("temperature CRC mismatch")
-        if data[5] != CRC(data[3:5]):
-            raise RuntimeError("humidity CRC mismatch")
+        invalid = check_words(data)
+        if invalid != -1:
+            raise RuntimeError(("temperature", "humidity")[invalid] + " CRC mismatch")
         return [celsius, humidity]
 
     def process_readings(self, arg):
@@ -48,27 +111,17 @@ class TempSHT35(object):
         """
         # read and log pm sensor data
         try:
-            timestamp = csv_timestamp_template.format(*time.gmtime())  # get current time in desired format
+            epoch = time.time()
             read_lst = self.read()  # read SHT35 sensor - [celsius, humidity] to ~5 significant figures
             round_lst = [int(round(x, 1)*10) for x in read_lst]  # round readings to 1 significant figure, shift left, cast to int
-            str_round_lst = list(map(str, round_lst))  # cast int to string
-            lst_to_log = [timestamp] + str_round_lst
-            line_to_log = ','.join(lst_to_log)
-            self.sensor_logger.log_row(line_to_log)
+            if self.sensor_logger.binary:
+                self.sensor_logger.log_sample(epoch, round_lst)
+            else:
+                timestamp = csv_timestamp_template.format(*time.gmtime(epoch))  # get current time in desired format
+                str_round_lst = list(map(str, round_lst))  # cast int to string
+                lst_to_log = [timestamp] + str_round_lst
+                line_to_log = ','.join(lst_to_log)
+                self.sensor_logger.log_row(line_to_log, round_lst)
         except Exception as e:
             self.status_logger.exception("Failed to read from temperature and humidity sensor")
             blink_led((0x550000, 0.4, True))
-
-
-#  Cycling redundancy check
-def CRC(data):
-    crc = 0xff
-    for s in data:
-        crc ^= s
-        for i in range(8):
-            if crc & 0x80:
-                crc <<= 1
-                crc ^= 0x131
-            else:
-                crc <<= 1
-    return crc
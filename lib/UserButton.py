@@ -1,6 +1,7 @@
 from machine import Timer, reset
 from new_config import new_config
 from helper import led_lock
+from LoggerFactory import flush_logs
 import _thread
 
 
@@ -42,6 +43,7 @@ class UserButton:
                 if self.reboot_timer.read() < 1.5:
                     try:  # if sd card failed to mount handle exception thrown in logger
                         self.logger.info("Button press - rebooting...")
+                        flush_logs()
                     except Exception as e:
                         pass
                     reset()
@@ -0,0 +1,124 @@
+"""
+Archive of sensor readings. The file of each interval is renamed into the archive as a segment instead of being copied,
+segments are listed in order in a manifest, so that they can be read back as one file.
+"""
+
+import os
+import time
+import strings as s
+
+# directories known to exist
+_created_dirs = set()
+
+
+def _make_dir(path):
+    if path in _created_dirs:
+        return
+    try:
+        os.mkdir(path)
+    except OSError:
+        pass  # already exists
+    _created_dirs.add(path)
+
+
+def archive_dir(sensor_name, sensor_id, date=None):
+    """
+    Gets the directory of the segments of a sensor for a day. Segments are kept in a directory per day, as FAT looks up
+    names by scanning the directory, so a directory per month would hold thousands of segments
+    :param sensor_name: PM1, PM2 or TEMP
+    :type sensor_name: str
+    :param sensor_id: id of the sensor
+    :type sensor_id: str
+    :param date: (year, month, day), current day if None
+    :type date: tuple(int, int, int)
+    :return: path of the directory, ending with '/'
+    :rtype: str
+    """
+
+    if date is None:
+        date = time.gmtime()[:3]
+    return s.archive_path + sensor_name + '_' + sensor_id + '/' + "{:04d}_{:02d}/{:02d}".format(*date) + '/'
+
+
+def archive_segment(source_path, sensor_name, sensor_id, extension):
+    """
+    Renames a file of readings into the archive as a new segment and appends it to the manifest
+    :param source_path: path of the file, on the same SD card as the archive
+    :type source_path: str
+    :param sensor_name: PM1, PM2 or TEMP
+    :type sensor_name: str
+    :param sensor_id: id of the sensor
+    :type sensor_id: str
+    :param extension: extension of the file, s.csv_extension or s.binary_extension
+    :type extension: str
+    :return: path of the segment
+    :rtype: str
+    """
+
+    t = time.gmtime()
+    directory = archive_dir(sensor_name, sensor_id, t[:3])
+    month_dir = directory[:directory.rindex('/', 0, -1)]
+    _make_dir(month_dir[:month_dir.rindex('/')])
+    _make_dir(month_dir)
+    _make_dir(directory[:-1])
+
+    name = "{:02d}{:02d}{:02d}".format(*t[3:6])  # hhmmss
+    suffix = 0
+    segment = name + extension
+    while _size(directory + segment) is not None:  # a segment of the same second exists
+        suffix += 1
+        segment = name + '_' + str(suffix) + extension
+    os.rename(source_path, directory + segment)
+
+    with open(directory + s.archive_manifest, 'a') as f:
+        f.write(segment + ',' + str(_size(directory + segment)) + '\n')
+    return directory + segment
+
+
+def segments(directory):
+    """
+    Lists the segments of a directory of the archive in the order they were archived
+    :param directory: path of the directory, ending with '/'
+    :type directory: str
+    :return: paths of the segments
+    :rtype: list of str
+    """
+
+    paths = []
+    try:
+        with open(directory + s.archive_manifest, 'r') as f:
+            for line in f:
+                name = line.split(',')[0]
+                if name:
+                    paths.append(directory + name)
+    except OSError:
+        pass  # no segments archived yet
+    return paths
+
+
+def read_segments(directory, chunk_size=512):
+    """
+    Reads the segments of a directory of the archive as one file. Binary segments each start with their header, read
+    them one by one with sample_log instead.
+    :param directory: path of the directory, ending with '/'
+    :type directory: str
+    :param chunk_size: maximum size of the chunks
+    :type chunk_size: int
+    :return: generator of chunks of the segments, in order
+    :rtype: generator of bytes
+    """
+
+    for path in segments(directory):
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+def _size(path):
+    try:
+        return os.stat(path)[6]
+    except OSError:
+        return None
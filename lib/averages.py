@@ -3,8 +3,11 @@ Tasks to be called by event scheduler
 """
 
 import os
-from helper import mean_across_arrays, minutes_of_the_month, blink_led, get_sensors, get_format, current_lock
+from helper import minutes_of_the_month, blink_led, current_lock
 from Configuration import config
+from RunningAverage import get_running_average
+from SensorLogger import flush_sensor_rows, sample_extension
+from archive import archive_segment
 import strings as s
 import time
 
@@ -21,9 +24,10 @@ def get_sensor_averages(logger, lora):
     logger.debug("Calculating averages")
 
     # get a dictionary of sensors and their status
-    sensors = get_sensors()
-    fmt = get_format(sensors)
-    version = str(config.get_config("fmt_version"))
+    snapshot = config.snapshot()
+    sensors = snapshot.sensors
+    fmt = snapshot.fmt
+    version = snapshot.fmt_version
     timestamp = s.csv_timestamp_template.format(*time.gmtime())  # get current time in desired format
     minutes = str(minutes_of_the_month())  # get minutes past last midnight
 
@@ -37,7 +41,7 @@ def get_sensor_averages(logger, lora):
         line_to_log = '{}' + fmt + ',' + version + ',' + minutes
         for sensor_name in [s.TEMP, s.PM1, s.PM2]:
             if sensors[sensor_name]:
-                line_to_log += ',' + str(config.get_config(sensor_name + "_id")) + ',' + ','.join(sensor_averages[sensor_name + "_avg"]) + ',' + str(sensor_averages[sensor_name + "_count"])
+                line_to_log += ',' + snapshot.sensor_ids[sensor_name] + ',' + ','.join(sensor_averages[sensor_name + "_avg"]) + ',' + str(sensor_averages[sensor_name + "_count"])
         line_to_log += '\n'
 
         # Logs line_to_log to archive and places copies into relevant to_send folders
@@ -46,11 +50,11 @@ def get_sensor_averages(logger, lora):
             year_month = timestamp[2:4] + "," + timestamp[5:7] + ','
             lora.lora_buffer.write(line_to_log.format(year_month))
 
-        # If raw data was processed, saved and dumped, processing files can be deleted
+        # If raw data was processed, saved and dumped, processing files that could not be archived can be deleted
         path = s.processing_path
         for sensor_name in [s.TEMP, s.PM1, s.PM2]:
             if sensors[sensor_name]:
-                filename = sensor_name + '.csv'
+                filename = sensor_name + sample_extension()
                 try:
                     os.remove(path + filename)
                 except Exception as e:
@@ -63,57 +67,54 @@ def get_sensor_averages(logger, lora):
 
 def calculate_average(sensor_name, logger):
     """
-    Calculates averages for specific columns of sensor data to be sent over LoRa. Sets placeholders if it fails.
+    Takes the running averages of specific columns of sensor data to be sent over LoRa, and archives the readings of
+    the interval. Sets placeholders if there are no readings.
     :param sensor_name: PM1, PM2 or TEMP
     :type sensor_name: str
     :param logger: status logger
     :type logger: LoggerFactory object
     """
 
-    filename = sensor_name + '.csv'
+    filename = sensor_name + sample_extension()
     sensor_type = config.get_config(sensor_name)
-    sensor_id = str(config.get_config(sensor_name + "_id"))
-    # headers in current file of the sensor according to its type
-    headers = s.headers_dict_v4[sensor_type]
+    sensor_id = config.snapshot().sensor_ids[sensor_name]
+    running_average = get_running_average(sensor_name)
 
     # data to send if no readings are available
     avg_readings_str = list('0' * len(s.lora_sensor_headers[sensor_type]))
     count = 0
+    error = None  # failure to move the readings to processing
 
-    try:
-        with current_lock:
+    with current_lock:
+        # Take averages of the interval, they are sent even if the readings cannot be moved to processing
+        averages, readings, minimum, maximum = running_average.snapshot()
+        try:
             # Move sensor_name.csv from current dir to processing dir
+            flush_sensor_rows(sensor_name)
             os.rename(s.current_path + filename, s.processing_path + filename)
+        except Exception as e:
+            error = e
 
-            with open(s.processing_path + filename, 'r') as f:
-                # read all lines from processing
-                lines = f.readlines()
-                lines_lst = []  # list of lists that store average sensor readings from specific columns
-                for line in lines:
-                    stripped_line = line[:-1]  # strip \n
-                    stripped_line_lst = str(stripped_line).split(',')  # split string to list at comas
-                    named_line = dict(zip(headers, stripped_line_lst))  # assign each value to its header
-                    sensor_reading = []
-                    for header in s.lora_sensor_headers[sensor_type]:
-                        sensor_reading.append(int(named_line[header]))
-                    # Append extra lines here for more readings - update version number and back-end to interpret data
-                    lines_lst.append(sensor_reading)
-                    count += 1
-
-                # Compute averages from sensor_name.csv.processing
-                avg_readings_str = [str(int(i)) for i in mean_across_arrays(lines_lst)]
-
-                # Append content of sensor_name.csv.processing into sensor_name.csv
-                with open(s.archive_path + sensor_name + '_' + sensor_id + '.csv', 'a') as f:
-                    for line in lines:
-                        f.write(line)
-
-    except Exception as e:
+    if readings == 0:
         logger.error("No readings from sensor {}".format(sensor_name))
         logger.warning("Setting 0 as a place holder")
         blink_led((0x550000, 0.4, True))
-    finally:
-        return {sensor_name + "_avg": avg_readings_str, sensor_name + "_count": count}
+    else:
+        avg_readings_str = [str(i) for i in averages]
+        count = readings
+        logger.debug("{} - min: {}, max: {}".format(sensor_name, minimum, maximum))
+
+    if error is not None:
+        if readings != 0:  # no file is expected without readings
+            logger.exc(error, "Failed to move readings from sensor {} to processing".format(sensor_name))
+    else:
+        try:
+            # Move sensor_name.csv from processing dir to the archive as a segment
+            archive_segment(s.processing_path + filename, sensor_name, sensor_id, sample_extension())
+        except Exception as e:
+            logger.exception("Failed to archive readings from sensor {}".format(sensor_name))
+
+    return {sensor_name + "_avg": avg_readings_str, sensor_name + "_count": count}
 
 
 def log_averages(line_to_log):
@@ -0,0 +1,96 @@
+"""
+Checksums of the sensor drivers, computed over a range of a buffer. Pass a memoryview to avoid copying the range.
+"""
+
+
+def sum16(data, start=0, end=None):
+    """
+    Sum of the bytes modulo 2^16, used by Plantower sensors
+    :param data: buffer holding the bytes
+    :type data: bytes, bytearray or memoryview
+    :param start: index of the first byte
+    :type start: int
+    :param end: index after the last byte, end of the buffer if None
+    :type end: int
+    :return: checksum
+    :rtype: int
+    """
+
+    if end is None:
+        end = len(data)
+    return sum(data[start:end]) & 0xFFFF
+
+
+def sensirion_checksum(data, start=0, end=None):
+    """
+    Inverted least significant byte of the sum of the bytes, used by the SHDLC protocol of Sensirion sensors
+    :param data: buffer holding the bytes
+    :type data: bytes, bytearray or memoryview
+    :param start: index of the first byte
+    :type start: int
+    :param end: index after the last byte, end of the buffer if None
+    :type end: int
+    :return: checksum
+    :rtype: int
+    """
+
+    if end is None:
+        end = len(data)
+    return ~sum(data[start:end]) & 0xFF
+
+
+def _crc8_table(polynomial):
+    table = bytearray(256)
+    for byte in range(256):
+        crc = byte
+        for i in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ polynomial) & 0xFF
+            else:
+                crc = (crc << 1) & 0xFF
+        table[byte] = crc
+    return table
+
+
+# CRC-8 of Sensirion I2C sensors, polynomial 0x31 (x^8 + x^5 + x^4 + 1), initialised to 0xFF
+CRC8_TABLE = _crc8_table(0x31)
+CRC8_INIT = 0xFF
+
+
+def crc8(data, start=0, end=None):
+    """
+    CRC-8 used by Sensirion I2C sensors such as the SHT35
+    :param data: buffer holding the bytes
+    :type data: bytes, bytearray or memoryview
+    :param start: index of the first byte
+    :type start: int
+    :param end: index after the last byte, end of the buffer if None
+    :type end: int
+    :return: checksum
+    :rtype: int
+    """
+
+    if end is None:
+        end = len(data)
+    crc = CRC8_INIT
+    table = CRC8_TABLE
+    for i in range(start, end):
+        crc = table[crc ^ data[i]]
+    return crc
+
+
+def check_words(data):
+    """
+    Verifies a frame of Sensirion I2C sensors, made of 16 bit words each followed by its CRC-8
+    :param data: frame, three bytes per word
+    :type data: bytes, bytearray or memoryview
+    :return: index of the first word with a wrong CRC, -1 if all words are valid
+    :rtype: int
+    """
+
+    table = CRC8_TABLE
+    for word in range(len(data) // 3):
+        i = word * 3
+        if table[table[CRC8_INIT ^ data[i]] ^ data[i + 1]] != data[i + 2]:
+            return word
+    return -1
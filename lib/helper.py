@@ -39,23 +39,37 @@ def minutes_of_the_month():
     return ((days - 1) * 24 * 60) + (hours * 60) + minutes
 
 
-def mean_across_arrays(arrays):
+def month_expiry_cutoff():
     """
-    Computes elementwise mean across arrays.
-    E.g. for input [[1, 2, 4], [5, 3, 6]] returns [3, 2.5, 5]
-    :param arrays: list of arrays of the same length
-    :return: elementwise average across arrays
+    Messages are timestamped with minutes of the month, so they have to be sent within a month. Messages of the
+    previous month are expired if their minutes of the month are less than a day ahead of now, older messages are
+    always expired.
+    :return: time before which messages are expired (seconds since epoch)
+    :rtype: int
     """
-    out_arr = []
-    n_arrays = len(arrays)
-    # Iterate through the elements in an array
-    for i in range(len(arrays[0])):
-        sm = 0
-        # Iterate through all the arrays
-        for array in arrays:
-            sm += array[i]
-        out_arr.append(sm/n_arrays)
-    return out_arr
+    t = time.gmtime()
+    year, month = t[0], t[1]
+    if month == 1:
+        previous_year, previous_month = year - 1, 12
+    else:
+        previous_year, previous_month = year, month - 1
+    start_of_month = time.mktime((year, month, 1, 0, 0, 0, 0, 0))
+    start_of_previous_month = time.mktime((previous_year, previous_month, 1, 0, 0, 0, 0, 0))
+    minutes_now = ((t[2] - 1) * 24 * 60) + (t[3] * 60) + t[4]
+    return min(start_of_previous_month + (minutes_now + 24 * 60) * 60, start_of_month)
+
+
+def buffer_line_timestamp(line):
+    """
+    Gets the time of a line in the lora buffer from its year, month and minutes of the month
+    :param line: line from the lora buffer - year, month, format, version, minutes, ...
+    :type line: str
+    :return: time of the line (seconds since epoch)
+    :rtype: int
+    """
+    line_lst = line.split(',')
+    year, month, minutes = int(line_lst[0]) + 2000, int(line_lst[1]), int(line_lst[4])
+    return time.mktime((year, month, 1, 0, 0, 0, 0, 0)) + minutes * 60
 
 
 def blink_led(args):
@@ -102,19 +116,3 @@ def get_sensors():
             sensors[sensor] = True
 
     return sensors
-
-
-def get_format(sensors):
-    """
-    Constructs a format based on the type of sensors that are enabled
-    :param sensors: Dictionary of sensors (TEMP, PM1, PM2) and whether they are enabled in the configurations
-    :type sensors: dict
-    :return: format
-    :rtype: str
-    """
-    fmt = ""
-    for sensor_name in [s.TEMP, s.PM1, s.PM2]:
-        if sensors[sensor_name]:  # if the sensor is enabled
-            fmt += sensor_name[0]  # add the first character to fmt to construct format eg.: TPP, TP, PP, P, T
-
-    return fmt
@@ -3,6 +3,7 @@ import GpsSIM28
 from PM_read import pm_thread
 from loggingpycom import INFO, WARNING, CRITICAL, DEBUG, ERROR
 from Configuration import config
+from RingBuffer import LEGACY_SUFFIX
 import _thread
 import strings as s
 import os
@@ -109,11 +110,12 @@ def initialise_file_system():
 
 def remove_residual_files():
     """
-    Removes residual files from the last boot in the current and processing dirs
+    Removes residual files from the last boot in the current and processing dirs. The lora buffer is kept, along with
+    a buffer file in an older layout whose migration was interrupted by a reset
     """
     for path in [s.current_path, s.processing_path]:
         for file in os.listdir(path[:-1]):  # Strip '/' from the end of path
-            if file != s.lora_file_name:
+            if file not in (s.lora_file_name, s.lora_file_name + LEGACY_SUFFIX):
                 os.remove(path + file)
 
 
@@ -39,20 +39,25 @@ class Logger:
         return level >= (self.level or _level)
 
     def log(self, level, msg, *args):
-        if level >= (self.level or _level):
-            record = LogRecord(
-                self.name, level, None, None, msg, args, None, None, None
-            )
-
-            if self.handlers:
-                for hdlr in self.handlers:
-                    hdlr.emit(record)
-
+        if level >= (self.level or _level) and self.handlers:
+            self._log(level, msg, args, None)
+
+    def _log(self, level, msg, args, exc_info):
+        # The message is only rendered by the formatter of a handler that emits the record
+        record = LogRecord(
+            self.name, level, None, None, msg, args, exc_info, None, None
+        )
+        for hdlr in self.handlers:
+            hdlr.emit(record)
+
+    # Levels are checked before calling log, so that disabled messages cost one comparison
     def debug(self, msg, *args):
-        self.log(DEBUG, msg, *args)
+        if DEBUG >= (self.level or _level):
+            self.log(DEBUG, msg, *args)
 
     def info(self, msg, *args):
-        self.log(INFO, msg, *args)
+        if INFO >= (self.level or _level):
+            self.log(INFO, msg, *args)
 
     def warning(self, msg, *args):
         self.log(WARNING, msg, *args)
@@ -64,9 +69,9 @@ class Logger:
         self.log(CRITICAL, msg, *args)
 
     def exc(self, e, msg, *args):
-        buf = uio.StringIO()
-        sys.print_exception(e, buf)
-        self.log(ERROR, msg + "\n" + buf.getvalue(), *args)
+        # The traceback is rendered by the formatter, only if the record is emitted
+        if ERROR >= (self.level or _level) and self.handlers:
+            self._log(ERROR, msg, args, e)
 
     def exception(self, msg, *args):
         self.exc(sys.exc_info()[1], msg, *args)
@@ -173,38 +178,60 @@ class Formatter:
 
         self.style = style
 
-    def usesTime(self):
+        # The format string is parsed once for the record attributes it uses
+        self._fields = self._parse_fields()
+        self._uses_time = "asctime" in self._fields
+
+    def _parse_fields(self):
+        fields = []
         if self.style == "%":
-            return "%(asctime)" in self.fmt
-        elif self.style == "{":
-            return "{asctime" in self.fmt
+            start = self.fmt.find("%(")
+            while start != -1:
+                end = self.fmt.find(")", start)
+                if end == -1:
+                    break
+                fields.append(self.fmt[start + 2:end])
+                start = self.fmt.find("%(", end)
+        else:
+            start = self.fmt.find("{")
+            while start != -1:
+                end = start + 1
+                while end < len(self.fmt) and self.fmt[end] not in "}:!.[":
+                    end += 1
+                if end > start + 1:
+                    fields.append(self.fmt[start + 1:end])
+                start = self.fmt.find("{", end)
+        return tuple(fields)
+
+    def usesTime(self):
+        return self._uses_time
 
     def format(self, record):
         # The message attribute of the record is computed using msg % args.
-        record.message = record.msg % record.args
+        message = record.getMessage()
 
         # If the formatting string contains '(asctime)', formatTime() is called to
         # format the event time.
-        if self.usesTime():
+        if self._uses_time:
             record.asctime = self.formatTime(record, self.datefmt)
 
         # If there is exception information, it is formatted using formatException()
         # and appended to the message. The formatted exception information is cached
         # in attribute exc_text.
         if record.exc_info is not None:
-            record.exc_text += self.formatException(record.exc_info)
-            record.message += "\n" + record.exc_text
+            if record.exc_text is None:
+                record.exc_text = self.formatException(record.exc_info)
+            message += "\n" + record.exc_text
 
-        # The record’s attribute dictionary is used as the operand to a string
+        # The attributes used by the formatting string are the operand to a string
         # formatting operation.
+        values = {}
+        for field in self._fields:
+            values[field] = message if field == "message" else getattr(record, field, None)
         if self.style == "%":
-            return self.fmt % record.__dict__
-        elif self.style == "{":
-            return self.fmt.format(**record.__dict__)
+            return self.fmt % values
         else:
-            raise ValueError(
-                "Style {0} is not supported by logging.".format(self.style)
-            )
+            return self.fmt.format(**values)
 
     def formatTime(self, record, datefmt=None):
         assert datefmt is None  # datefmt is not supported
@@ -212,7 +239,9 @@ class Formatter:
         return "{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(*ct)
 
     def formatException(self, exc_info):
-        raise NotImplementedError()
+        buf = uio.StringIO()
+        sys.print_exception(exc_info, buf)
+        return buf.getvalue()
 
     def formatStack(self, stack_info):
         raise NotImplementedError()
@@ -222,6 +251,9 @@ root = getLogger()
 
 
 class LogRecord:
+    __slots__ = ("created", "msecs", "name", "levelno", "levelname", "pathname", "lineno", "msg", "args",
+                 "exc_info", "func", "sinfo", "message", "asctime", "exc_text")
+
     def __init__(
         self, name, level, pathname, lineno, msg, args, exc_info, func=None, sinfo=None
     ):
@@ -238,3 +270,12 @@ class LogRecord:
         self.exc_info = exc_info
         self.func = func
         self.sinfo = sinfo
+        self.message = None  # rendered by getMessage
+        self.asctime = None
+        self.exc_text = None
+
+    def getMessage(self):
+        """Render msg % args once, when a handler formats the record."""
+        if self.message is None:
+            self.message = self.msg % self.args if self.args else str(self.msg)
+        return self.message
@@ -1,7 +1,10 @@
 import os
 import sys
+import _thread
 from loggingpycom import Handler
 
+QUEUE_CAPACITY_DEFAULT = 64  # records kept in a QueueHandler before the oldest ones are dropped
+
 
 def try_remove(fn: str) -> None:
     """Try to remove a file if it existst."""
@@ -27,6 +30,7 @@ class RotatingFileHandler(Handler):
         self.filename = filename
         self.maxBytes = maxBytes
         self.backupCount = backupCount
+        self._f = None
 
         try:
             self._counter = get_filesize(self.filename)
@@ -35,27 +39,127 @@ class RotatingFileHandler(Handler):
 
     def emit(self, record):
         """Write to file."""
+        self.write_batch([self.formatter.format(record)])
+
+    def write_batch(self, messages):
+        """Write formatted messages to file, which is kept open between batches."""
+        for msg in messages:
+            s_len = len(msg)
+
+            if self.maxBytes and self.backupCount and self._counter + s_len > self.maxBytes:
+                self.close()
+
+                # remove the last backup file if it is there
+                try_remove(self.filename + ".{0}".format(self.backupCount))
+
+                for i in range(self.backupCount - 1, 0, -1):
+                    if i < self.backupCount:
+                        try:
+                            os.rename(
+                                self.filename + ".{0}".format(i),
+                                self.filename + ".{0}".format(i + 1),
+                            )
+                        except OSError:
+                            pass
+
+                os.rename(self.filename, self.filename + ".1")
+                self._counter = 0
+
+            if self._f is None:
+                self._f = open(self.filename, "a")
+            self._f.write(msg + "\n")
+
+            self._counter += s_len
+
+        if self._f is not None:
+            self._f.flush()
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class QueueHandler(Handler):
+    """A handler that formats records and keeps them in a bounded ring.
+
+    Records are written by a QueueListener on its own thread, so emit never
+    waits for a file. When the ring is full the oldest record is dropped.
+    """
+
+    def __init__(self, capacity=QUEUE_CAPACITY_DEFAULT):
+        super().__init__()
+        self.capacity = capacity
+        self._ring = [None] * capacity
+        self._head = 0  # index of the oldest record
+        self._count = 0
+        self.dropped = 0  # number of records dropped since the handler was created
+        self._lock = _thread.allocate_lock()
+        self.wakeup = _thread.allocate_lock()  # released when records are queued
+        self.wakeup.acquire()
+
+    def emit(self, record):
+        """Queue the formatted record."""
         msg = self.formatter.format(record)
-        s_len = len(msg)
-
-        if self.maxBytes and self.backupCount and self._counter + s_len > self.maxBytes:
-            # remove the last backup file if it is there
-            try_remove(self.filename + ".{0}".format(self.backupCount))
-
-            for i in range(self.backupCount - 1, 0, -1):
-                if i < self.backupCount:
-                    try:
-                        os.rename(
-                            self.filename + ".{0}".format(i),
-                            self.filename + ".{0}".format(i + 1),
-                        )
-                    except OSError:
-                        pass
-
-            os.rename(self.filename, self.filename + ".1")
-            self._counter = 0
+        with self._lock:
+            if self._count == self.capacity:
+                self._head = (self._head + 1) % self.capacity  # drop the oldest record
+                self._count -= 1
+                self.dropped += 1
+            self._ring[(self._head + self._count) % self.capacity] = msg
+            self._count += 1
+            if self.wakeup.locked():
+                self.wakeup.release()
+
+    def get_batch(self):
+        """Remove and return all queued messages, oldest first."""
+        with self._lock:
+            batch = []
+            for i in range(self._count):
+                index = (self._head + i) % self.capacity
+                batch.append(self._ring[index])
+                self._ring[index] = None
+            self._head = 0
+            self._count = 0
+            return batch
+
+
+class QueueListener:
+    """Writes the records of a QueueHandler to handlers with write_batch.
+
+    A single writer thread waits for records and hands them over in batches.
+    Call flush before resetting the device, so that queued records are not lost.
+    """
+
+    def __init__(self, queue, *handlers):
+        self.queue = queue
+        self.handlers = handlers
+        self.reported_dropped = 0
+        self.failed = 0  # number of records that could not be written
+        self._write_lock = _thread.allocate_lock()  # held while a batch is written
+
+    def start(self):
+        _thread.start_new_thread(self._run, (0, 0))
 
-        with open(self.filename, "a") as f:
-            f.write(msg + "\n")
+    def _run(self, arg1, arg2):
+        """Writer thread, takes two dummy arguments required by the threading library."""
+        while True:
+            self.queue.wakeup.acquire()  # wait for records
+            self.flush()
 
-        self._counter += s_len
+    def flush(self):
+        """Write all queued records from the calling thread, after any batch the writer thread is writing."""
+        with self._write_lock:
+            batch = self.queue.get_batch()
+            dropped = self.queue.dropped
+            if dropped != self.reported_dropped:
+                batch.insert(0, "{0} log records dropped".format(dropped - self.reported_dropped))
+                self.reported_dropped = dropped
+            if not batch:
+                return
+            for handler in self.handlers:
+                try:
+                    handler.write_batch(batch)
+                except Exception as e:
+                    handler.close()  # e.g. SD card not mounted yet, reopen with the next batch
+                    self.failed += len(batch)
@@ -0,0 +1,308 @@
+"""
+Reference decoder for payloads sent over LoRaWAN. Only depends on struct and strings, so it can be run on a host to
+check what the back-end should decode from a given port and payload.
+"""
+
+import struct
+import strings as s
+
+SENSOR_GROUP_LENGTH = 4  # each sensor in a message has an id, two averages and a count
+IDS_FLAG = 0x80  # set on the port byte of compact payloads that include sensor ids
+
+
+class PayloadException(Exception):
+    """
+    Exception to be thrown if a line of the lora buffer cannot be packed
+    """
+    pass
+
+
+def compile_plans():
+    """
+    Compiles a packing plan for each format, so that lines of the lora buffer can be cast in a single pass
+    :return: dictionary of format name to (port, structure, converter for each field, number of fields)
+    :rtype: dict
+    """
+    compiled = {}
+    for fmt_name, port_struct_dict in (("TPP", s.TPP), ("TP", s.TP), ("PP", s.PP), ("P", s.P), ("T", s.T), ("G", s.G)):
+        structure = port_struct_dict["structure"]
+        converters = tuple(float if c == 'f' else int for c in structure[1:])  # '<' stripped
+        compiled[fmt_name] = (port_struct_dict["port"], structure, converters, len(converters))
+    return compiled
+
+
+# packing plan for each format, and format name and structure for each port of a single message
+plans = compile_plans()
+port_formats = {}
+for fmt_name in plans:
+    port_formats[plans[fmt_name][0]] = (fmt_name, plans[fmt_name][1])
+
+
+def cast_message(buffer_line):
+    """
+    Casts fields of a line of the lora buffer according to the packing plan of its format
+    :param buffer_line: line from the lora buffer - year, month, format, fields of the message
+    :type buffer_line: str
+    :return: format, fields of the message
+    :rtype: str, list
+    """
+    buffer_lst = buffer_line.split(',')
+    try:
+        port, structure, converters, field_count = plans[buffer_lst[2]]
+    except (IndexError, KeyError):
+        raise PayloadException("Unknown format in line: " + buffer_line)
+    if len(buffer_lst) - 3 != field_count:  # year, month and format are not packed
+        raise PayloadException("Wrong number of fields in line: " + buffer_line)
+    try:
+        return buffer_lst[2], [convert(field) for convert, field in zip(converters, buffer_lst[3:])]
+    except ValueError:
+        raise PayloadException("Invalid field in line: " + buffer_line)
+
+
+def pack_message(buffer_line):
+    """
+    Constructs payload of a single message from a line of the lora buffer according to its format
+    :param buffer_line: line from the lora buffer
+    :type buffer_line: str
+    :return: port, fields of the message, payload
+    :rtype: int, list, bytes
+    """
+    fmt_name, values = cast_message(buffer_line)
+    port, structure = plans[fmt_name][0], plans[fmt_name][1]
+    return port, values, struct.pack(structure, *values)
+
+
+def decode_payload(port, payload):
+    """
+    Decodes a payload received on a given port to a list of messages
+    :param port: LoRaWAN port the payload was received on
+    :type port: int
+    :param payload: payload received
+    :type payload: bytes
+    :return: list of (format, values) for each message in the payload
+    :rtype: list
+    """
+
+    if port == s.BATCH["port"]:
+        return decode_batch(payload)
+    if port == s.COMPACT["port"]:
+        return decode_compact(payload)[1]
+
+    fmt_name, structure = port_formats[port]
+    return [(fmt_name, struct.unpack(structure, payload))]
+
+
+def decode_batch(payload):
+    """
+    Decodes a batch of messages, each of them prefixed with the port of its format
+    :param payload: payload received on the batch port
+    :type payload: bytes
+    :return: list of (format, values) for each message in the batch, newest first
+    :rtype: list
+    """
+
+    if payload[0] != s.BATCH["fmt_version"]:
+        raise ValueError("Unknown batch format version {}".format(payload[0]))
+
+    messages = []
+    offset = 1
+    while offset < len(payload):
+        fmt_name, structure = port_formats[payload[offset]]
+        offset += 1
+        messages.append((fmt_name, struct.unpack_from(structure, payload, offset)))
+        offset += struct.calcsize(structure)
+
+    return messages
+
+
+def time_on_air_ms(payload_length, sf, bandwidth_khz=125):
+    """
+    Time on air of a LoRaWAN uplink, following the Semtech LoRa modem designer's guide, with 13 bytes of LoRaWAN
+    header, port and MIC, an 8 symbol preamble, explicit header, CRC and coding rate 4/5
+    :param payload_length: application payload size in bytes
+    :type payload_length: int
+    :param sf: spreading factor
+    :type sf: int
+    :param bandwidth_khz: bandwidth in kHz
+    :type bandwidth_khz: int
+    :return: time on air in milliseconds, rounded up
+    :rtype: int
+    """
+    symbol_ms = (1 << sf) / bandwidth_khz
+    low_data_rate = 1 if symbol_ms > 16 else 0  # low data rate optimisation, used for SF11 and SF12 at 125 kHz
+    bits = 8 * (payload_length + 13) - 4 * sf + 28 + 16
+    blocks = max(-(-bits // (4 * (sf - 2 * low_data_rate))), 0)
+    symbols = 12.25 + 8 + blocks * 5
+    return int(-(-symbols * symbol_ms // 1))
+
+
+def is_compact(fmt_name):
+    """
+    :param fmt_name: name of the format, e.g. TPP
+    :type fmt_name: str
+    :return: True if messages of the format can be delta encoded (only integer fields)
+    :rtype: bool
+    """
+    return fmt_name in plans and float not in plans[fmt_name][2]
+
+
+def compact_indices(fmt_name):
+    """
+    Indices of the fields of a message that are delta encoded, and of the sensor ids. The fmt_version (index 0) is not
+    sent in compact payloads.
+    :param fmt_name: name of the format, e.g. TPP
+    :type fmt_name: str
+    :return: value_indices, id_indices
+    :rtype: tuple, tuple
+    """
+    id_indices = tuple(2 + SENSOR_GROUP_LENGTH * i for i in range(len(fmt_name)))
+    field_count = 2 + SENSOR_GROUP_LENGTH * len(fmt_name)
+    value_indices = tuple(i for i in range(1, field_count) if i not in id_indices)
+    return value_indices, id_indices
+
+
+def write_varint(out, value):
+    """
+    Appends an unsigned integer to a bytearray, 7 bits per byte, least significant first
+    """
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(payload, offset):
+    """
+    :return: value, offset after the value
+    :rtype: int, int
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = payload[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def zigzag(value):
+    """
+    Maps signed integers to unsigned ones, so that small negative numbers are encoded in few bytes
+    """
+    if value < 0:
+        return (-value << 1) - 1
+    return value << 1
+
+
+def unzigzag(value):
+    if value & 1:
+        return -((value + 1) >> 1)
+    return value >> 1
+
+
+def compact_header(fmt_name, ids=None):
+    """
+    :param fmt_name: name of the format of the messages
+    :type fmt_name: str
+    :param ids: sensor ids to include, None if they were acknowledged by the back-end
+    :type ids: tuple
+    :return: header of a compact payload
+    :rtype: bytearray
+    """
+    port = plans[fmt_name][0]
+    if ids is None:
+        header = bytearray([s.COMPACT["fmt_version"], port])
+    else:
+        header = bytearray([s.COMPACT["fmt_version"], port | IDS_FLAG])
+        for sensor_id in ids:
+            write_varint(header, sensor_id)
+    return header
+
+
+def compact_message(values, previous, value_indices):
+    """
+    :param values: fields of a message as packed for its own port
+    :type values: list
+    :param previous: fields of the previous message in the payload, None for the first one
+    :type previous: list
+    :param value_indices: indices of the fields that are sent
+    :type value_indices: tuple
+    :return: message encoded as differences from the previous one
+    :rtype: bytearray
+    """
+    out = bytearray()
+    for i in value_indices:
+        if previous is None:
+            write_varint(out, zigzag(values[i]))
+        else:
+            write_varint(out, zigzag(values[i] - previous[i]))
+    return out
+
+
+def encode_compact(fmt_name, messages, ids=None):
+    """
+    Encodes messages of the same format into a compact payload
+    :param fmt_name: name of the format of the messages
+    :type fmt_name: str
+    :param messages: fields of each message as packed for its own port, newest first
+    :type messages: list
+    :param ids: sensor ids to include, None if they were acknowledged by the back-end
+    :type ids: tuple
+    :return: payload
+    :rtype: bytes
+    """
+    value_indices = compact_indices(fmt_name)[0]
+    payload = compact_header(fmt_name, ids)
+    previous = None
+    for values in messages:
+        payload += compact_message(values, previous, value_indices)
+        previous = values
+    return bytes(payload)
+
+
+def decode_compact(payload, ids=None):
+    """
+    Decodes a compact payload
+    :param payload: payload received on the compact port
+    :type payload: bytes
+    :param ids: sensor ids last received from the device for this format, used if the payload does not include them
+    :type ids: tuple
+    :return: sensor ids, list of (format, values) for each message, newest first, with values laid out as for the port
+    of the format without fmt_version
+    :rtype: tuple, list
+    """
+
+    if payload[0] != s.COMPACT["fmt_version"]:
+        raise ValueError("Unknown compact format version {}".format(payload[0]))
+
+    fmt_name = port_formats[payload[1] & ~IDS_FLAG][0]
+    value_indices, id_indices = compact_indices(fmt_name)
+    offset = 2
+
+    if payload[1] & IDS_FLAG:
+        ids = []
+        for i in id_indices:
+            sensor_id, offset = read_varint(payload, offset)
+            ids.append(sensor_id)
+        ids = tuple(ids)
+    elif ids is None:
+        raise ValueError("Sensor ids were not included and are not known")
+
+    messages = []
+    values = [0] * (value_indices[-1] + 1)
+    for i, sensor_id in zip(id_indices, ids):
+        values[i] = sensor_id
+    first = True
+    while offset < len(payload):
+        for i in value_indices:
+            value, offset = read_varint(payload, offset)
+            if first:
+                values[i] = unzigzag(value)
+            else:
+                values[i] += unzigzag(value)
+        first = False
+        messages.append((fmt_name, tuple(values[1:])))
+
+    return ids, messages
@@ -7,6 +7,7 @@ import pycom
 import gc
 from Configuration import config
 from helper import wifi_lock, led_lock, blink_led
+from LoggerFactory import flush_logs
 from RtcDS1307 import clock
 import ujson
 import ubinascii
@@ -15,7 +16,8 @@ import machine
 def new_config(logger, arg):
     """
     Method that turns the pycom to an access point for the user to connect and update the configurations.
-    The device automatically reboots and applies modifications upon successful configuration.
+    The device automatically reboots and applies modifications upon successful configuration, unless all changed
+    settings are applied by running subsystems.
     Takes an extra dummy argument required by the threading library.
     :param logger: status logger
     :type logger: LoggerFactory
@@ -50,12 +52,20 @@ def new_config(logger, arg):
 
             pycom.rgbled(0x000055)  # Blue LED - waiting for connection
 
-            get_new_config(sct, logger)
+            changed = get_new_config(sct, logger)
 
             wlan.deinit()  # turn off wifi
             gc.collect()
 
+            config.flush()
+            if changed and config.is_hot(changed):
+                logger.info('Configuration applied without rebooting: ' + ', '.join(changed))
+                pycom.rgbled(0x000000)
+                led_lock.release()
+                return
+
             logger.info('rebooting...')
+            flush_logs()
             machine.reset()
 
 
@@ -67,6 +77,8 @@ def get_new_config(sct, logger):
     :type sct: socket object
     :param logger: status logger
     :type logger: LoggerFactory object
+    :return: changed configuration keys, None if configuration failed
+    :rtype: list of str
     """
     try:
         while True:
@@ -79,8 +91,9 @@ def get_new_config(sct, logger):
             received_data = str(client.recv(3000))  # wait for client response
             # logger.debug(received_data)
             client.close()  # socket has to be closed because of the loop
-            if process_data(received_data, logger):
-                return
+            changed = process_data(received_data, logger)
+            if changed is not None:
+                return changed
     except Exception as e:
         logger.exception("Failed to configure the device")
         led_lock.release()
@@ -95,8 +108,8 @@ def process_data(received_data, logger):
     :type received_data: str
     :param logger: status logger
     :type logger: LoggerFactory
-    :return: True or False
-    :rtype: bool
+    :return: changed configuration keys, None if no configuration was received
+    :rtype: list of str
     """
     #  find json string in received message
     first_index = received_data.rfind('time_begin')
@@ -127,10 +140,9 @@ def process_data(received_data, logger):
         if len(config_json_str) >= 1000:
             logger.error('Received configurations are too long')
             logger.info('Enter configurations with valid length')
-            return False  # keep looping - wait for new message from client
+            return None  # keep looping - wait for new message from client
 
         logger.info('Configuration data received from user')
-        config.save_config(new_config_dict)
-        return True
+        return config.save_config(new_config_dict)
 
-    return False  # keep looping - wait for new message from client
+    return None  # keep looping - wait for new message from client
@@ -6,6 +6,8 @@
 """
 
 from plantowerpycom import logging
+from checksum import sum16
+import struct
 import time
 from machine import Timer, UART
 
@@ -22,6 +24,12 @@ DEFAULT_LOGGING_LEVEL = logging.WARN
 MSG_CHAR_1 = b'\x42'  # First character to be received in a valid packet
 MSG_CHAR_2 = b'\x4d'  # Second character to be received in a valid packet
 
+FRAME_LENGTH = 32  # Length of a packet including the start characters and the checksum
+FRAME_DATA_LENGTH = 28  # Length field of a valid packet, counts the bytes after it
+BUFFER_LENGTH = 64  # Size of the receive buffer, holds two packets
+READING_FORMAT = '>12H'  # Readings of a packet, starting at READING_OFFSET
+READING_OFFSET = 4
+
 
 class PlantowerReading(object):
     """
@@ -34,25 +42,23 @@ class PlantowerReading(object):
             an object containing the data
         """
         self.timestamp = timestamp_template.format(*time.gmtime())
-        self.pm10_cf1 = round(line[4] * 256 + line[5], 1)
-        self.pm25_cf1 = round(line[6] * 256 + line[7], 1)
-        self.pm100_cf1 = round(line[8] * 256 + line[9], 1)
-        self.pm10_std = round(line[10] * 256 + line[11], 1)
-        self.pm25_std = round(line[12] * 256 + line[13], 1)
-        self.pm100_std = round(line[14] * 256 + line[15], 1)
-        self.gr03um = round(line[16] * 256 + line[17], 1)
-        self.gr05um = round(line[18] * 256 + line[19], 1)
-        self.gr10um = round(line[20] * 256 + line[21], 1)
-        self.gr25um = round(line[22] * 256 + line[23], 1)
-        self.gr50um = round(line[24] * 256 + line[25], 1)
-        self.gr100um = round(line[26] * 256 + line[27], 1)
+        (self.pm10_cf1, self.pm25_cf1, self.pm100_cf1,
+         self.pm10_std, self.pm25_std, self.pm100_std,
+         self.gr03um, self.gr05um, self.gr10um,
+         self.gr25um, self.gr50um, self.gr100um) = struct.unpack_from(READING_FORMAT, line, READING_OFFSET)
+
+    def values(self):
+        """
+            Returns the readings in the order of __str__, without the timestamp
+        """
+        return (self.pm10_cf1, self.pm10_std, self.pm25_cf1, self.pm25_std,
+                self.pm100_cf1, self.pm100_std, self.gr03um, self.gr05um,
+                self.gr10um, self.gr25um, self.gr50um, self.gr100um)
 
     def __str__(self):
         return (
                 "%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s" %
-                (self.timestamp, self.pm10_cf1, self.pm10_std, self.pm25_cf1, self.pm25_std,
-                 self.pm100_cf1, self.pm100_std, self.gr03um, self.gr05um,
-                 self.gr10um, self.gr25um, self.gr50um, self.gr100um))
+                ((self.timestamp,) + self.values()))
 
 
 class PlantowerException(Exception):
@@ -84,6 +90,7 @@ class Plantower(object):
         # logging.basicConfig(
         #     format='%(asctime)s - %(name)s - %(lineno)d - %(levelname)s - %(message)s')
         self.logger.setLevel(log_level)
+        self.debug_enabled = self.logger.isEnabledFor(logging.DEBUG)  # guards debug messages with costly arguments
         self.pins = pins
         self.logger.info("Serial pins: %s", self.pins)
         self.baud = baud
@@ -94,6 +101,9 @@ class Plantower(object):
         self.logger.info("Read Timeout: %s", self.read_timeout)
         self.id = id
         self.chrono = Timer.Chrono()
+        self.buffer = bytearray(BUFFER_LENGTH)  # Bytes received but not yet consumed
+        self.view = memoryview(self.buffer)
+        self.filled = 0
         try:
             self.serial = UART(
                 self.id,
@@ -111,47 +121,79 @@ class Plantower(object):
             Enables the class logging level to be changed after it's created
         """
         self.logger.setLevel(log_level)
+        self.debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
 
     def _verify(self, recv):
         """
             Uses the last 2 bytes of the data packet from the Plantower sensor
             to verify that the data received is correct
         """
-        calc = 0
-        ord_arr = []
-        for c in bytearray(recv[:-2]):  # Add all the bytes together except the checksum bytes
-            calc += c
-            ord_arr.append(c)
-        self.logger.debug(str(ord_arr))
-        sent = (recv[-2] << 8) | recv[-1]  # Combine the 2 bytes together
+        calc = sum16(recv, 0, FRAME_LENGTH - 2)  # Add all the bytes together except the checksum bytes
+        if self.debug_enabled:
+            self.logger.debug(str(list(recv[:FRAME_LENGTH])))
+        sent = (recv[FRAME_LENGTH - 2] << 8) | recv[FRAME_LENGTH - 1]  # Combine the 2 bytes together
         if sent != calc:
             self.logger.error("Checksum failure %d != %d", sent, calc)
             raise PlantowerException("Checksum failure")
 
+    def _consume(self, count):
+        """
+            Drops the first count bytes of the receive buffer, moving the
+            remaining bytes to its start
+        """
+        buffer = self.buffer
+        remaining = self.filled - count
+        for i in range(remaining):
+            buffer[i] = buffer[count + i]
+        self.filled = remaining
+
+    def _synchronise(self):
+        """
+            Drops bytes from the receive buffer until it starts with the
+            packet start characters, keeps a trailing first character
+        """
+        buffer = self.buffer
+        char_1 = MSG_CHAR_1[0]
+        char_2 = MSG_CHAR_2[0]
+        i = 0
+        while i < self.filled - 1 and not (buffer[i] == char_1 and buffer[i + 1] == char_2):
+            i += 1
+        if i == self.filled - 1 and buffer[i] != char_1:
+            i = self.filled
+        if i:
+            self._consume(i)
+
     def read(self):
         """
-            Reads a line from the serial port and return
-            if perform_flush is set to true it will flush the serial buffer
-            before performing the read, otherwise, it'll just read the first
-            item in the buffer
+            Reads a packet from the serial port and returns it as a reading.
+            Bytes are drained from the serial port into the receive buffer,
+            which is resynchronised on the packet start characters. Bytes
+            following a packet are kept for the next read
         """
-        recv = b''
         read_timeout = self.read_timeout
         chrono = self.chrono
         chrono.reset()  # Reset the timer
         chrono.start()  # Start timer
         while (chrono.read() < read_timeout):
-            inp = self.serial.read(1)  # Read a character from the input
-            if inp == MSG_CHAR_1:  # check it matches
-                recv += inp  # if it does add it to receive string
-                inp = self.serial.read(1)  # read the next character
-                if inp == MSG_CHAR_2:  # check it's what's expected
-                    recv += inp  # att it to the receive string
-                    recv += self.serial.read(30)  # read the remaining 30 bytes
-                    self._verify(recv)  # verify the checksum
-                    chrono.stop()  # Stop the timer
-                    return PlantowerReading(recv)  # convert to reading object
-            # If the character isn't what we are expecting loop until timeout
+            self._synchronise()
+            if self.filled >= FRAME_LENGTH:
+                if self.buffer[2] << 8 | self.buffer[3] != FRAME_DATA_LENGTH:
+                    self._consume(1)  # not a packet, look for the next start characters
+                    continue
+                try:
+                    self._verify(self.view)  # verify the checksum
+                except PlantowerException as e:
+                    self._consume(1)
+                    chrono.stop()
+                    raise e
+                reading = PlantowerReading(self.buffer)  # convert to reading object
+                self._consume(FRAME_LENGTH)
+                chrono.stop()  # Stop the timer
+                return reading
+            received = self.serial.readinto(self.view[self.filled:])
+            if received:
+                self.filled += received
+            # If the packet isn't complete loop until timeout
         chrono.stop()  # Stop the timer (in case the while loop timed out)
 
         raise PlantowerException("No message received")
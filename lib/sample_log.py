@@ -0,0 +1,112 @@
+"""
+Binary log of sensor readings. A file starts with a header describing the schema, followed by fixed size records
+packed with the structure of the sensor type. Can be run on a host to convert the files to csv.
+"""
+
+import struct
+import time
+import strings as s
+
+MAGIC = b'SMPL'
+VERSION = 1
+# magic-4s / version-B / seconds from 1970 to the epoch of the device-I / schema length-H / schema
+HEADER_FORMAT = '<4sBIH'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+EPOCH_2000 = 946684800  # seconds from 1970 to 2000, the epoch of some MicroPython ports
+
+
+class SampleLogException(Exception):
+    """
+    Exception to be thrown if a file is not a valid sample log
+    """
+    pass
+
+
+def encode_header(sensor_type):
+    """
+    Constructs the header of a sample log of a sensor
+    :param sensor_type: type of the sensor, e.g. PMS5003 or SHT35
+    :type sensor_type: str
+    :return: header
+    :rtype: bytes
+    """
+
+    headers = [header for header in s.headers_dict_v4[sensor_type] if header]
+    schema = (sensor_type + ';' + s.sample_structures[sensor_type] + ';' + ','.join(headers)).encode()
+    epoch_offset = EPOCH_2000 if time.gmtime(0)[0] == 2000 else 0
+    return struct.pack(HEADER_FORMAT, MAGIC, VERSION, epoch_offset, len(schema)) + schema
+
+
+def encode_sample(structure, epoch, values):
+    """
+    Packs a reading into a record
+    :param structure: structure of the sensor type from s.sample_structures
+    :type structure: str
+    :param epoch: time of the reading in seconds since the epoch of the device
+    :type epoch: int
+    :param values: readings in the order of the sensor headers, without the timestamp
+    :type values: list of int
+    :return: record
+    :rtype: bytes
+    """
+
+    return struct.pack(structure, epoch, *values)
+
+
+def read_header(f):
+    """
+    Reads the header of a sample log, leaving the file at the first record
+    :param f: file opened in binary mode
+    :type f: file object
+    :return: sensor type, record structure, headers, seconds from 1970 to the epoch of the device
+    :rtype: str, str, list of str, int
+    """
+
+    header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        raise SampleLogException("Header is incomplete")
+    magic, version, epoch_offset, schema_length = struct.unpack(HEADER_FORMAT, header)
+    if magic != MAGIC or version != VERSION:
+        raise SampleLogException("Not a sample log of version {}".format(VERSION))
+    sensor_type, structure, headers = f.read(schema_length).decode().split(';')
+    return sensor_type, structure, headers.split(','), epoch_offset
+
+
+def read_samples(f):
+    """
+    Reads the records of a sample log
+    :param f: file opened in binary mode
+    :type f: file object
+    :return: generator of the records - epoch seconds since 1970, readings
+    :rtype: generator of (int, tuple)
+    """
+
+    sensor_type, structure, headers, epoch_offset = read_header(f)
+    size = struct.calcsize(structure)
+    while True:
+        record = f.read(size)
+        if len(record) < size:  # a record cut off by a reset is dropped
+            return
+        values = struct.unpack(structure, record)
+        yield values[0] + epoch_offset, values[1:]
+
+
+def to_csv(sample_path, csv_path):
+    """
+    Converts a sample log to a csv file in the format of the current dir, run on a host with an epoch of 1970
+    :param sample_path: path of the sample log
+    :type sample_path: str
+    :param csv_path: path of the csv file to write
+    :type csv_path: str
+    :return: number of records converted
+    :rtype: int
+    """
+
+    count = 0
+    with open(sample_path, 'rb') as f:
+        with open(csv_path, 'w') as out:
+            for epoch, values in read_samples(f):
+                timestamp = s.csv_timestamp_template.format(*time.gmtime(epoch))
+                out.write(timestamp + ',' + ','.join(str(i) for i in values) + '\n')
+                count += 1
+    return count
@@ -50,11 +50,14 @@ class Logger:
             else:
                 print(msg % args, file=_stream)
 
+    # Levels are checked before calling log, so that disabled messages cost one comparison
     def debug(self, msg, *args):
-        self.log(DEBUG, msg, *args)
+        if DEBUG >= (self.level or _level):
+            self.log(DEBUG, msg, *args)
 
     def info(self, msg, *args):
-        self.log(INFO, msg, *args)
+        if INFO >= (self.level or _level):
+            self.log(INFO, msg, *args)
 
     def warning(self, msg, *args):
         self.log(WARNING, msg, *args)
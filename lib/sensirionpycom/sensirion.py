@@ -8,11 +8,13 @@
 """
 
 from sensirionpycom import logging
+from checksum import sensirion_checksum
 from machine import Timer, UART
 import struct
 import time
 
 from sensirionpycom.sensirion_error_codes import ERROR_CODE_NO_ERROR, lookup_error_code
+from sensirionpycom.shdlc import MAX_FRAME_LENGTH, encode_frame, ShdlcDecoder
 
 timestamp_template = "{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}"  # yyyy-mm-dd hh-mm-ss
 
@@ -74,13 +76,19 @@ class SensirionReading(object):
         self.n10 = round(struct.unpack('>f', line[37:41])[0], 1)
         self.tps = round(struct.unpack('>f', line[41:45])[0], 1)
 
+    def values(self):
+        """
+            Returns the readings in the order of __str__, without the timestamp
+        """
+        return (self.pm1, self.pm25,
+                self.pm4, self.pm10, self.n05,
+                self.n1, self.n25, self.n4,
+                self.n10, self.tps)
+
     def __str__(self):
         return (
             "%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s" %
-            (self.timestamp, self.pm1, self.pm25,
-             self.pm4, self.pm10, self.n05,
-             self.n1, self.n25, self.n4,
-             self.n10, self.tps))
+            ((self.timestamp,) + self.values()))
 
 class SensirionException(Exception):
     """
@@ -108,6 +116,7 @@ class Sensirion(object):
         # logging.basicConfig(
         #     format='%(asctime)s - %(name)s - %(lineno)d - %(levelname)s - %(message)s')
         self.logger.setLevel(log_level)
+        self.debug_enabled = self.logger.isEnabledFor(logging.DEBUG)  # guards debug messages with costly arguments
         self.id = id
         self.pins = pins
         self.logger.info("Serial pins: %s", self.pins)
@@ -121,6 +130,10 @@ class Sensirion(object):
         self.logger.info("Retries: %d", self.retries)
         self.measurement_running = False
         self.timer = Timer.Chrono()
+        self.tx_buffer = bytearray(MAX_FRAME_LENGTH)
+        self.rx_buffer = bytearray(MAX_FRAME_LENGTH)
+        self.rx_view = memoryview(self.rx_buffer)
+        self.decoder = ShdlcDecoder()
         try:
             self.serial = UART(
                 self.id,
@@ -140,19 +153,16 @@ class Sensirion(object):
             Enables the class logging level to be changed after it's created
         """
         self.logger.setLevel(log_level)
+        self.debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
 
     def _verify(self, recv):
         """
             Uses the last 2 bytes of the data packet from the Honeywell sensor
             to verify that the data recived is correct
         """
-        calc = self._calculate_checksum(
-            bytes([recv[1]]) +  bytes([recv[2]]) + bytes([recv[3]]) + bytes([recv[4]]),
-            recv[5:-2])
-        self.logger.debug(type(calc))
+        calc = sensirion_checksum(memoryview(recv), 1, len(recv) - 2)  # header and data, without the start byte
         sent = recv[-2]
-        self.logger.debug(type(bytes([sent])))
-        if bytes([sent]) != calc:
+        if sent != calc:
             self.logger.error("Checksum failure 0x%02x != 0x%02x", sent, calc)
             raise SensirionException("Checksum failure")
 
@@ -198,73 +208,36 @@ class Sensirion(object):
 
     def _rx(self, addr, cmd):
         """
-            Recieve and process a message from the sensor
+            Recieve and process a message from the sensor, returns the
+            unstuffed message
         """
-        recv = b''
         chrono = Timer.Chrono()
         chrono.reset()  # Reset the timer
         chrono.start()  # Start timer
         while chrono.read() < self.read_timeout:
-            inp = self.serial.read(1) # Read a character from the input
-            if inp == MSG_START_STOP: # check it matches
-                recv += inp # if it does add it to recieve string
-                self.logger.debug(
-                    "Message : 0x%02x --------", int.from_bytes(recv, "big"))
-                inp = self.serial.read(1) # read the next character
-                self.logger.debug("Addr byte 0x%02x", ord(inp))
-                if inp == addr:
-                    recv += inp
-                    self.logger.debug(
-                        "Message : 0x%02x --------", int.from_bytes(recv, "big"))
-                    inp = self.serial.read(1)
-                    self.logger.debug("Cmd byte : 0x%02x --------", ord(inp))
-                    if inp == cmd:
-                        recv += inp
-                        self.logger.debug(
-                            "Message : 0x%02x --------", int.from_bytes(recv, "big"))
-                        inp = self.serial.read(1)
-                        self.logger.debug("Error state byte : 0x%02x --------", ord(inp))
-                        if inp != ERROR_CODE_NO_ERROR:
-                            self.logger.error("State error : 0x%02x --------", ord(inp))
-                            error_str = lookup_error_code(inp)
-                            self.logger.error(error_str)
-                            while inp != MSG_START_STOP: #empty the cache of the sensor
-                                inp = self.serial.read(1)
-                            raise SensirionException(error_str)
-                        else:
-                            recv += inp
-                            self.logger.debug(
-                                "Message : 0x%02x --------",
-                                int.from_bytes(recv, "big"))
-                            inp = self.serial.read(1)
-                            while inp != MSG_START_STOP: #read remaining data until the end byte
-                                recv += inp
-                                self.logger.debug(
-                                    "Message : 0x%02x --------",
-                                    int.from_bytes(recv, "big"))
-                                inp = self.serial.read(1)
-                                self.logger.debug("Bytes : 0x%02x --------", ord(inp))
-                            recv += inp
-                            self.logger.debug(
-                                "Message received : 0x%02x --------",
-                                int.from_bytes(recv, "big"))
-
-                            return recv
-                    else:
-                        self.logger.error(
-                            "Wrong command received 0x%02x, was expecting 0x%02x",
-                            ord(inp), ord(cmd))
-                        self.logger.debug(
-                            "Message received 0x%02x", int.from_bytes(recv, "big"))
-                        raise SensirionException("Wrong command")
-                else:
+            received = self.serial.readinto(self.rx_buffer)
+            if not received:
+                continue
+            for recv in self.decoder.feed(self.rx_view[:received]):
+                if len(recv) < 7:
+                    self.logger.error("Message too short, %d bytes", len(recv))
+                    raise SensirionException("Message incomplete")
+                if recv[1] != addr[0]:
                     self.logger.error(
                         "Wrong address received 0x%02x, was expecting 0x%02x",
-                        ord(inp), ord(addr))
-                    self.logger.debug(
-                        "Message received 0x%02x",
-                        int.from_bytes(recv, "big"))
+                        recv[1], ord(addr))
                     raise SensirionException("Wrong address")
+                if recv[2] != cmd[0]:
+                    self.logger.error(
+                        "Wrong command received 0x%02x, was expecting 0x%02x",
+                        recv[2], ord(cmd))
+                    raise SensirionException("Wrong command")
+                if recv[3] != ERROR_CODE_NO_ERROR[0]:
+                    self.logger.error("State error : 0x%02x --------", recv[3])
+                    error_str = lookup_error_code(recv[3:4])
+                    self.logger.error(error_str)
+                    raise SensirionException(error_str)
+                return recv
 
         raise SensirionException("Message incomplete")
 
@@ -334,14 +307,13 @@ class Sensirion(object):
             try:
                 self._tx(CMD_ADDR, CMD_READ_MEASUREMENT)
                 time.sleep(RX_DELAY_S)
-                recv = self._rx(CMD_ADDR, CMD_READ_MEASUREMENT)
-                recv_unstuffed = self._unstuff_bytes(recv)
+                recv_unstuffed = self._rx(CMD_ADDR, CMD_READ_MEASUREMENT)
                 self._check_length(recv_unstuffed)
                 self._verify(recv_unstuffed) # verify the checksum
-                self.logger.debug(
-                    "Verified message : 0x%02x --------",
-                    int.from_bytes(recv_unstuffed, "big"))
-                self.logger.debug(type(recv_unstuffed))
+                if self.debug_enabled:
+                    self.logger.debug(
+                        "Verified message : 0x%02x --------",
+                        int.from_bytes(recv_unstuffed, "big"))
                 self.timer.reset()
                 self.timer.start()
                 return SensirionReading(recv_unstuffed)
@@ -391,85 +363,6 @@ class Sensirion(object):
             cmd = b'\x01'
             data = [b'\x01',b\'x08',b'\xae', ....]
         """
-        checksum = self._calculate_checksum(
-            addr + cmd + bytes([len(data)]), data) #checksum calculated before byte_stuffing
-        message = MSG_START_STOP
-        message += self._stuff_bytes(addr)
-        message += self._stuff_bytes(cmd)
-        message += self._stuff_bytes(bytes([len(data)])) # Length
-        message += self._stuff_bytes(data)
-        message += self._stuff_bytes(checksum)
-        message += MSG_START_STOP
-        self.logger.debug("Message sent: 0x%02x --------", int.from_bytes(message, "big"))
-        return self.serial.write(message)
-
-    def _stuff_bytes(self, data):
-        """
-            Covert the data into the stuffed format required for transmission
-        """
-        data_stuffed = b''
-        data_len = 0
-        for i in data:
-            self.logger.debug("Bytes : 0x%02x --------", i)
-            if bytes([i]) == b'\x7E':
-                data_stuffed += b'\x7D' + b'\x5E'
-                data_len += 2
-            elif bytes([i]) == b'\x7D':
-                data_stuffed += b'\x7D' + b'\x5D'
-                data_len += 2
-            elif bytes([i]) == b'\x11':
-                data_stuffed += b'\x7D' + b'\x31'
-                data_len += 2
-            elif bytes([i]) == b'\x13':
-                data_stuffed += b'\x7D' + b'\x33'
-                data_len += 2
-            else:
-                data_stuffed += bytes([i])
-                data_len += 1
-        return data_stuffed
-
-    def _unstuff_bytes(self, data):
-        """
-        Reverse the data stuffing used on the serial protocol
-        """
-        data_unstuffed = b''
-        i = 0
-        while i < len(data):
-            self.logger.debug("Lenght : %02x --------", len(data))
-            self.logger.debug("i : %02x --------", i)
-            self.logger.debug("Bytes : 0x%02x --------", data[i])
-            if bytes([data[i]]) == b'\x7d':
-                self.logger.debug("Bytes +1 : 0x%02x --------", data[i+1])
-                if bytes([data[i + 1]]) == b'\x5e':
-                    data_unstuffed += b'\x7e'
-                    i += 2
-                elif bytes([data[i + 1]]) == b'\x5d':
-                    data_unstuffed += b'\x7d'
-                    i += 2
-                elif bytes([data[i + 1]]) == b'\x31':
-                    data_unstuffed += b'\x11'
-                    i += 2
-                elif bytes([data[i + 1]]) == b'\x33':
-                    data_unstuffed += b'\x13'
-                    i += 2
-            else:
-                data_unstuffed += bytes([data[i]])
-                i += 1
-        self.logger.debug(
-            "Message unstuffed: 0x%02x --------",
-            int.from_bytes(data_unstuffed, "big"))
-        return data_unstuffed
-
-
-    def _calculate_checksum(self, header, data):
-        """
-            Sum all the bytes between MSG_START_STOP (included) and the Checksum
-        """
-        self.logger.debug("Type header : %s", type(header))
-        self.logger.debug("Type data : %s", type(data))
-        sum_bytes = bytes([(sum(data) + sum(header))%256])
-        # Take the LSB
-        lsb = (ord(sum_bytes) >> 0)
-        # Invert it to get the checksum
-        self.logger.debug("Checksum : 0x%02x", ord(bytes([255 - lsb])))
-        return bytes([255 - lsb])
+        length = encode_frame(self.tx_buffer, addr, cmd, data)  # checksum calculated before byte_stuffing
+        self.decoder.reset()  # drop any partial answer to a previous message
+        return self.serial.write(memoryview(self.tx_buffer)[:length])
@@ -0,0 +1,109 @@
+"""
+    Byte stuffing of the SHDLC frames used by Sensirion sensors
+    Frames start and end with 0x7E, bytes 0x7E, 0x7D, 0x11 and 0x13
+    in between are sent as 0x7D followed by an escaped byte
+"""
+
+from checksum import sensirion_checksum
+
+START_STOP = 0x7E
+ESCAPE = 0x7D
+MAX_DATA_LENGTH = 255
+MAX_FRAME_LENGTH = 2 + 2 * (4 + MAX_DATA_LENGTH + 1)  # Start and stop bytes, every other byte stuffed
+MAX_UNSTUFFED_LENGTH = 2 + 4 + MAX_DATA_LENGTH + 1
+
+# Escaped byte for every byte that has to be stuffed, 0 for bytes sent as they are
+STUFF_TABLE = bytearray(256)
+# Original byte for every escaped byte, 0 for bytes that are not a valid escape
+UNSTUFF_TABLE = bytearray(256)
+for _byte, _escaped in ((0x7E, 0x5E), (0x7D, 0x5D), (0x11, 0x31), (0x13, 0x33)):
+    STUFF_TABLE[_byte] = _escaped
+    UNSTUFF_TABLE[_escaped] = _byte
+
+
+def stuff(data, out, index):
+    """
+        Writes the stuffed data to out starting at index, returns the index
+        after the last byte written
+    """
+    for byte in data:
+        escaped = STUFF_TABLE[byte]
+        if escaped:
+            out[index] = ESCAPE
+            out[index + 1] = escaped
+            index += 2
+        else:
+            out[index] = byte
+            index += 1
+    return index
+
+
+def encode_frame(out, addr, cmd, data=b''):
+    """
+        Writes a complete stuffed frame with length and checksum to out,
+        which has to hold MAX_FRAME_LENGTH bytes. Returns the frame length
+    """
+    header = addr + cmd + bytes([len(data)])
+    checksum = sensirion_checksum(header + data)
+    out[0] = START_STOP
+    index = stuff(header, out, 1)
+    index = stuff(data, out, index)
+    index = stuff((checksum,), out, index)
+    out[index] = START_STOP
+    return index + 1
+
+
+class ShdlcDecoder(object):
+    """
+        Streaming decoder, takes chunks of bytes as received from the UART
+        and returns the unstuffed frames completed by them, including the
+        start and stop bytes
+    """
+
+    def __init__(self):
+        self.buffer = bytearray(MAX_UNSTUFFED_LENGTH)
+        self.reset()
+
+    def reset(self):
+        """
+            Drops a partially received frame
+        """
+        self.length = 0
+        self.in_frame = False
+        self.escape = False
+
+    def feed(self, chunk):
+        """
+            Decodes a chunk of bytes, returns a list of the completed frames
+        """
+        frames = []
+        buffer = self.buffer
+        for byte in chunk:
+            if byte == START_STOP:
+                if self.in_frame and self.length > 1 and not self.escape:
+                    buffer[self.length] = byte
+                    frames.append(bytes(buffer[:self.length + 1]))
+                    self.reset()
+                else:  # start of a frame, or a stop byte seen as a start byte when joining in the middle of a frame
+                    buffer[0] = byte
+                    self.length = 1
+                    self.in_frame = True
+                    self.escape = False
+            elif not self.in_frame:
+                continue
+            elif self.length >= MAX_UNSTUFFED_LENGTH - 1:
+                self.reset()  # too long to be a frame
+            elif self.escape:
+                byte = UNSTUFF_TABLE[byte]
+                if byte:
+                    buffer[self.length] = byte
+                    self.length += 1
+                    self.escape = False
+                else:
+                    self.reset()  # invalid escape sequence, drop the frame
+            elif byte == ESCAPE:
+                self.escape = True
+            else:
+                buffer[self.length] = byte
+                self.length += 1
+        return frames
@@ -1,5 +1,6 @@
 from Configuration import config
 from helper import wifi_lock, led_lock
+from LoggerFactory import flush_logs
 import machine
 import pycom
 import time
@@ -57,6 +58,7 @@ def software_update(logger):
         finally:
             # Turn off update mode
             config.save_config({"update": False})
+            config.flush()
 
             # Turn off indicator LED
             pycom.rgbled(0x000000)
@@ -64,4 +66,5 @@ def software_update(logger):
 
             # Reboot the device to apply patches
             logger.info("rebooting...")
+            flush_logs()
             machine.reset()
@@ -27,6 +27,8 @@ lora_sensor_headers = {
 status_header = ['type', 'timestamp', 'message']
 
 config_filename = 'config.txt'
+config_tmp_filename = 'config.tmp'  # configuration is written to this file, then renamed to config_filename
+counters_filename = 'counters.bin'  # volatile state saved often, e.g. air time of the LoRa uplinks sent today
 
 default_configuration = {"device_id": "", "device_name": "NewPyonAir", "password": "newpyonair", "region": "Europe",
                          "device_eui": "", "application_eui": "", "app_key": "", "SSID": "", "fmt_version": "",
@@ -62,6 +64,30 @@ archive_path = root_path + archive + '/'
 archive_averages_path = archive_path + archive_averages + '/'
 filesystem_dirs = [current, processing, archive]
 
+# Readings of each interval are archived as a segment in /sd/Archive/<sensor>_<id>/<yyyy_mm>/<dd>/, listed in the
+# manifest of the day
+archive_manifest = 'manifest.csv'
+
+# Buffering of sensor readings before they are written to the current dir, the time limit can be overridden by the
+# optional "sensor_flush_s" configuration key, readings buffered when the device resets are lost
+sensor_flush_bytes = 1024
+sensor_flush_s = 10
+
+# Format of the sensor readings in the current dir and the archive, "csv" or "binary", can be overridden by the optional
+# "sample_format" configuration key
+sample_format = "csv"
+csv_extension = '.csv'
+binary_extension = '.bin'
+
+# Binary sample records by sensor type: epoch seconds-I / readings in the order of headers_dict_v4
+sample_structures = {
+    "PMS5003": '<I12H',
+    "PMS7003": '<I12H',
+    "PMSA003": '<I12H',
+    "SPS030": '<I10H',
+    "SHT35": '<Ihh'
+}
+
 # Lora structures:
 
 # TEMP, PM1, PM2
@@ -90,3 +116,24 @@ T = {"port": 5, "structure": '<BHHhhH'}
 # GPS
 # fmt_version-B / timestamp-H / GPS_id-H / lat-f / long-f / alt-f
 G = {"port": 6, "structure": '<BHHfff'}
+
+# Batch of messages from the lora buffer, newest first, packed into a single uplink
+# batch_fmt_version-B / for each message: port of its format-B / message packed with the structure of its format
+BATCH = {"port": 7, "fmt_version": 2}
+
+# Consecutive messages of the same integer format (all except G), newest first, delta encoded into a single uplink
+# compact_fmt_version-B / port of the format of the messages (+128 if sensor ids are included)-B /
+# / sensor ids-varint (until acknowledged over LoRa, then every ids_period-th payload) / first message-zigzag varint /
+# / for each following message: difference from the previous message-zigzag varint
+# Messages are sent without fmt_version and sensor ids. Compact payloads are only sent if enabled by the optional
+# "lora_compact" configuration key, a single message is always sent on the port of its format.
+COMPACT = {"port": 8, "fmt_version": 3, "ids_period": 24}
+lora_compact = "OFF"
+
+# Maximum application payload (bytes) by region and spreading factor of the last uplink at 125 kHz bandwidth
+lora_max_payload = {
+    "Europe": {7: 222, 8: 222, 9: 115, 10: 51, 11: 51, 12: 51},
+    "Asia": {7: 222, 8: 222, 9: 115, 10: 51, 11: 51, 12: 51},
+    "Australia": {7: 222, 8: 222, 9: 115, 10: 51, 11: 51, 12: 51},
+    "United States": {7: 242, 8: 125, 9: 53, 10: 11}
+}
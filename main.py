@@ -40,6 +40,10 @@ except Exception as e:
         time.sleep(0.5)
         reboot_counter += 1
         if reboot_counter >= 180:
+            try:  # status log cannot be written if the SD card failed to mount
+                logger_factory.flush()
+            except Exception:
+                pass
             reset()
 
 try:
@@ -109,16 +113,18 @@ except Exception as e:
             reboot_counter += 1
             if reboot_counter >= 180:
                 status_logger.info("rebooting...")
+                logger_factory.flush()
                 reset()
         new_config(status_logger, arg=0)
     except Exception:
+        logger_factory.flush()
         reset()
 
 pycom.rgbled(0x552000)  # flash orange until its loaded
 
 # If sd, time, logger and configurations were set, continue with initialisation
 try:
-    from machine import Timer
+    from TaskScheduler import scheduler
     from SensorLogger import SensorLogger
     from EventScheduler import EventScheduler
     from helper import blink_led, get_sensors, led_lock
@@ -181,7 +187,7 @@ try:
         blink_led((0x005500, 0.5, True))
         time.sleep(0.5)
     # Initialise custom yellow heartbeat that triggers every 5 seconds
-    heartbeat = Timer.Alarm(blink_led, s=5, arg=(0x005500, 0.1, True), periodic=True)
+    heartbeat = scheduler.add(blink_led, s=5, arg=(0x005500, 0.1, True), periodic=True, name="heartbeat")
 
     # Try to update RTC module with accurate UTC datetime if GPS is enabled and has not yet synchronized
     if gps_on and update_time_later:
@@ -0,0 +1,38 @@
+"""
+Host-side tests of the modules in lib. Stand-ins for the MicroPython and Pycom modules they import are in tests/host.
+"""
+
+import os
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, "host"))
+sys.path.insert(0, os.path.join(os.path.dirname(here), "lib"))
+
+# the time module of MicroPython is utime, with ticks functions that CPython does not have
+import time
+import utime
+
+for name in ("ticks_ms", "ticks_us", "ticks_add", "ticks_diff", "sleep_ms", "sleep_us"):
+    if not hasattr(time, name):
+        setattr(time, name, getattr(utime, name))
+
+import pytest
+
+from Configuration import config
+from RunningAverage import running_averages
+from TaskScheduler import scheduler
+
+
+@pytest.fixture(autouse=True)
+def reset_singletons():
+    """
+    Tasks, configuration listeners and running averages are module-level singletons of lib, drop the ones a test left
+    behind, so that sensors created by earlier tests are not polled or reconfigured by later ones
+    """
+    listeners = list(config.listeners)
+    yield
+    for task in list(scheduler.tasks):
+        scheduler.cancel(task)
+    config.listeners[:] = listeners
+    running_averages.clear()
@@ -0,0 +1,155 @@
+"""
+Host stand-in for the parts of the Pycom machine module used by the modules under test. Peripherals talk to device
+models that tests attach to them.
+"""
+
+import os
+
+
+class I2C:
+    MASTER = 0
+
+    def __init__(self, bus, mode=MASTER, baudrate=100000, pins=None):
+        self.bus = bus
+        self.devices = {}  # address -> device model with write(data) and read(buf)
+        I2C.last = self
+
+    def attach(self, address, device):
+        self.devices[address] = device
+
+    def _device(self, address):
+        if address not in self.devices:
+            raise OSError(19, "I2C bus error")  # no ACK from the address
+        return self.devices[address]
+
+    def writeto(self, address, data):
+        self._device(address).write(bytes(data))
+        return len(data)
+
+    def readfrom_into(self, address, buf):
+        self._device(address).read(buf)
+
+    def readfrom(self, address, nbytes):
+        buf = bytearray(nbytes)
+        self.readfrom_into(address, buf)
+        return bytes(buf)
+
+
+class UART:
+    device = None  # optional model called with the bytes written, set on the class for drivers that talk in __init__
+
+    def __init__(self, bus, baudrate=9600, pins=None, **kwargs):
+        self.bus = bus
+        self.rx = bytearray()  # bytes waiting to be read, fed by tests or a device model
+        self.tx = bytearray()  # bytes written by the driver
+        UART.last = self
+
+    def feed(self, data):
+        self.rx += data
+
+    def any(self):
+        return len(self.rx)
+
+    def read(self, nbytes=None):
+        if not self.rx:
+            return None
+        if nbytes is None:
+            nbytes = len(self.rx)
+        data = bytes(self.rx[:nbytes])
+        del self.rx[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        if not self.rx:
+            return None
+        if nbytes is None:
+            nbytes = len(buf)
+        nbytes = min(nbytes, len(self.rx))
+        buf[:nbytes] = self.rx[:nbytes]
+        del self.rx[:nbytes]
+        return nbytes
+
+    def write(self, data):
+        self.tx += data
+        if self.device is not None:
+            self.device.write(bytes(data), self)
+        return len(data)
+
+    def deinit(self):
+        pass
+
+
+class Timer:
+    class Alarm:
+        def __init__(self, handler, s=0, ms=0, us=0, arg=None, periodic=False):
+            self.handler = handler
+            self.arg = self if arg is None else arg
+            self.periodic = periodic
+            self.active = True
+
+        def fire(self):
+            self.handler(self.arg)
+
+        def cancel(self):
+            self.active = False
+
+    class Chrono:
+        def __init__(self):
+            import time
+            self._time = time
+            self._start = None
+            self._elapsed = 0.0
+
+        def start(self):
+            self._start = self._time.time()
+
+        def stop(self):
+            if self._start is not None:
+                self._elapsed += self._time.time() - self._start
+                self._start = None
+
+        def reset(self):
+            self._elapsed = 0.0
+            if self._start is not None:
+                self._start = self._time.time()
+
+        def read(self):
+            if self._start is None:
+                return self._elapsed
+            return self._elapsed + self._time.time() - self._start
+
+        def read_ms(self):
+            return self.read() * 1000
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_DOWN = 2
+    PULL_UP = 1
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, pin, mode=IN, pull=None):
+        self.pin = pin
+        self._value = 0
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = value
+
+    def callback(self, trigger, handler=None, arg=None):
+        pass
+
+
+def unique_id():
+    return b'\x24\x0a\xc4\x00\x00\x01'
+
+
+def rng():
+    return int.from_bytes(os.urandom(3), 'little')
+
+
+def reset():
+    raise SystemExit("machine.reset()")
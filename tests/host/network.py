@@ -0,0 +1,19 @@
+"""
+Host stand-in for the parts of the Pycom network module used by the modules under test
+"""
+
+
+class LoRa:
+    LORAWAN = 0
+    EU868 = 5
+    AS923 = 0
+    AU915 = 1
+    US915 = 2
+    OTAA = 0
+    RX_PACKET_EVENT = 1
+
+    def __init__(self, mode=LORAWAN, region=EU868, adr=False):
+        self.mode = mode
+
+    def mac(self):
+        return b'\x70\xb3\xd5\x49\x90\x00\x00\x01'
@@ -0,0 +1,11 @@
+"""
+Host stand-in for the pycom module
+"""
+
+
+def heartbeat(enabled=None):
+    pass
+
+
+def rgbled(colour):
+    pass
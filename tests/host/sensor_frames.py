@@ -0,0 +1,42 @@
+"""
+Frames sent by the sensors over UART, for feeding the UART stand-in in tests and benchmarks
+"""
+
+import struct
+
+
+def plantower_frame(values):
+    """
+    :param values: the 12 readings of a Plantower frame, pm10_cf1 first
+    :type values: list of int
+    :return: frame with start characters, length, readings, reserved word and checksum
+    :rtype: bytes
+    """
+    frame = bytearray(b'\x42\x4d' + struct.pack('>H12HH', 28, *(list(values) + [0])))
+    frame += struct.pack('>H', sum(frame) & 0xffff)
+    return bytes(frame)
+
+
+def sensirion_frame(cmd, data=b'', state=0, addr=0):
+    """
+    :param cmd: command the SPS030 answers
+    :type cmd: int
+    :param data: data of the answer, e.g. ten big-endian floats for a measurement
+    :type data: bytes
+    :param state: state byte, 0 if the command succeeded
+    :type state: int
+    :param addr: address of the sensor
+    :type addr: int
+    :return: byte stuffed SHDLC frame with start and stop bytes
+    :rtype: bytes
+    """
+    content = bytes([addr, cmd, state, len(data)]) + data
+    content += bytes([~sum(content) & 0xff])
+    frame = bytearray(b'\x7e')
+    for byte in content:
+        if byte in (0x7e, 0x7d, 0x11, 0x13):
+            frame += bytes([0x7d, byte ^ 0x20])
+        else:
+            frame.append(byte)
+    frame.append(0x7e)
+    return bytes(frame)
@@ -0,0 +1,5 @@
+"""
+Host stand-in for the MicroPython ubinascii module
+"""
+
+from binascii import *
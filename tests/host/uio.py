@@ -0,0 +1,5 @@
+"""
+Host stand-in for the MicroPython uio module
+"""
+
+from io import *
@@ -0,0 +1,5 @@
+"""
+Host stand-in for the MicroPython ujson module
+"""
+
+from json import *
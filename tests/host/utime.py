@@ -0,0 +1,33 @@
+"""
+Host stand-in for the MicroPython time module, CPython's time module with the ticks functions added
+"""
+
+from time import *
+import time as _time
+
+
+def ticks_ms():
+    return int(_time.monotonic() * 1000) & 0x3fffffff
+
+
+def ticks_us():
+    return int(_time.monotonic() * 1000000) & 0x3fffffff
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & 0x3fffffff
+
+
+def ticks_diff(end, start):
+    diff = (end - start) & 0x3fffffff
+    if diff >= 0x20000000:
+        diff -= 0x40000000
+    return diff
+
+
+def sleep_ms(ms):
+    _time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    _time.sleep(us / 1000000)
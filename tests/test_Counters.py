@@ -0,0 +1,16 @@
+from Configuration import config
+from Counters import Counters
+import strings as s
+
+
+def test_air_time_seeded_from_message_count(tmp_path):
+    configuration = dict(s.default_configuration)
+    configuration.update({"air_time": 75, "message_count": 12, "transmission_date": 2020317})
+    config.set_config(configuration)
+    counters = Counters(str(tmp_path / "counters"))
+    assert counters.get("air_time_used") == 12 * 75
+    assert counters.get("transmission_date") == 2020317
+
+    # saved to the counters file, the configuration is not read again
+    config.set_config({"message_count": 0})
+    assert Counters(str(tmp_path / "counters")).get("air_time_used") == 12 * 75
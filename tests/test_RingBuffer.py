@@ -0,0 +1,64 @@
+import struct
+
+from helper import buffer_line_timestamp
+from RingBuffer import RingBuffer, HEADER_FORMAT, HEADER_SIZE, MAGIC, LEGACY_SUFFIX
+
+
+class FakeLogger:
+    def __init__(self):
+        self.messages = []
+
+    def info(self, msg):
+        self.messages.append(("info", msg))
+
+    def warning(self, msg):
+        self.messages.append(("warning", msg))
+
+    def error(self, msg):
+        self.messages.append(("error", msg))
+
+    def exception(self, msg):
+        self.messages.append(("exception", msg))
+
+
+def write_v1_buffer(path, lines, cell_size=100):
+    """
+    Writes a buffer file in the version 1 layout, cells with a length prefix only
+    """
+    cell_number = len(lines) + 1
+    header = struct.pack(HEADER_FORMAT, MAGIC, 1, 0, cell_size, cell_number, len(lines), 0, len(lines))
+    data = bytearray(header + bytes(HEADER_SIZE - len(header)))
+    for line in lines:
+        cell = struct.pack('<H', len(line)) + line
+        data += cell + bytes(cell_size - len(cell))
+    data += bytes(cell_size)
+    path.write_bytes(bytes(data))
+
+
+def test_migration_skips_bad_lines(tmp_path):
+    lines = [b"20,3,TPP,2,8640,1", b"not,a,buffer,line", b"\xff\xfe", b"x" * 98, b"20,3,TPP,2,8700,2"]
+    write_v1_buffer(tmp_path / ("LoRa_Buffer" + LEGACY_SUFFIX), lines)
+
+    logger = FakeLogger()
+    buffer = RingBuffer(logger, str(tmp_path) + '/', "LoRa_Buffer", 10, 100, get_timestamp=buffer_line_timestamp)
+
+    # the line without a time is kept, the undecodable line and the line too long for a cell are skipped
+    assert buffer.size() == 3
+    assert buffer.read(read_tail=True) == "20,3,TPP,2,8640,1"
+    assert buffer.read(read_tail=True, offset=1) == "not,a,buffer,line"
+    assert buffer.read() == "20,3,TPP,2,8700,2"
+    assert ("warning", "Skipped 2 messages that could not be migrated") in logger.messages
+    assert not (tmp_path / ("LoRa_Buffer" + LEGACY_SUFFIX)).exists()
+    buffer.close()
+
+
+def test_failed_migration_keeps_old_file(tmp_path):
+    legacy = tmp_path / ("LoRa_Buffer" + LEGACY_SUFFIX)
+    legacy.write_bytes(b"garbage")  # ASCII layout without a valid size line
+
+    logger = FakeLogger()
+    buffer = RingBuffer(logger, str(tmp_path) + '/', "LoRa_Buffer", 10, 100)
+
+    assert buffer.size() == 0
+    assert legacy.exists()  # migrated again on the next boot
+    buffer.close()
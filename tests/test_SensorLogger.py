@@ -0,0 +1,62 @@
+import pytest
+
+from Configuration import config
+from TaskScheduler import scheduler
+import strings as s
+from SensorLogger import SensorLogger
+
+
+@pytest.fixture
+def sensor_logger(tmp_path, monkeypatch):
+    config.set_config({"TEMP": "SHT35"})
+    logger = SensorLogger(sensor_name=s.TEMP, terminal_out=False)
+    logger.filename = str(tmp_path / "TEMP.csv")
+    yield logger
+    scheduler.cancel(logger.flush_task)
+
+
+def written(logger):
+    try:
+        with open(logger.filename) as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def test_rows_written_by_flush_task(sensor_logger):
+    sensor_logger.log_row("2020-03-01 00:00:30,215,450", [215, 450])
+    assert written(sensor_logger) == ""  # buffered in RAM
+    assert sensor_logger.flush_task.period_ms == s.sensor_flush_s * 1000
+
+    # the flush task writes buffered rows, even if no further row is logged
+    sensor_logger.flush_task.handler(sensor_logger.flush_task.arg)
+    assert written(sensor_logger) == "2020-03-01 00:00:30,215,450\n"
+
+    sensor_logger.flush_task.handler(sensor_logger.flush_task.arg)
+    assert sensor_logger.flushes == 1  # nothing to write
+
+
+def test_rows_written_once_buffer_is_full(sensor_logger):
+    row = "2020-03-01 00:00:30,215,450"
+    rows = s.sensor_flush_bytes // (len(row) + 1) + 1
+    for i in range(rows):
+        sensor_logger.log_row(row, [215, 450])
+    assert written(sensor_logger) == (row + "\n") * rows
+    assert sensor_logger.bytes_written == rows * (len(row) + 1)
+
+
+def test_sample_output_matches_row_output(sensor_logger, capsys):
+    sensor_logger.terminal_out = True
+    sensor_logger.log_row("1583020830,215,450", [215, 450])
+    sensor_logger.structure = s.sample_structures["SHT35"]
+    sensor_logger.log_sample(1583020830, [215, 450])
+    row_out, sample_out = capsys.readouterr().out.splitlines()
+    assert sample_out == row_out == "TEMP - 1583020830,215,450"
+
+
+def test_readings_added_with_their_rows(sensor_logger):
+    sensor_logger.log_row("2020-03-01 00:00:30,215,450", [215, 450])
+    sensor_logger.log_row("2020-03-01 00:00:31,225,460", [225, 460])
+    averages, readings, minimum, maximum = sensor_logger.running_average.snapshot()
+    assert (averages, readings) == ([220, 455], 2)
+    assert sensor_logger.buffered == 2 * len("2020-03-01 00:00:30,215,450\n")
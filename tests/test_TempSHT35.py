@@ -0,0 +1,144 @@
+import pytest
+
+from checksum import crc8
+from Configuration import config
+import TempSHT35
+from TempSHT35 import TempSHT35 as Sensor, PERIODIC_MODES, FETCH_DATA, BREAK, periodic_mode
+from machine import I2C
+
+PERIODIC_COMMANDS = [command for mps, command in PERIODIC_MODES]
+
+
+class FakeSHT35:
+    def __init__(self, celsius=21.5, humidity=45.0, mode=None):
+        """
+        Model of an SHT35 on the I2C bus. A periodic mode started before a soft reset of the host is kept, like the
+        sensor keeps power over machine.reset().
+        """
+        self.celsius = celsius
+        self.humidity = humidity
+        self.mode = mode
+        self.commands = []
+        self.corrupt = None  # index of a byte to corrupt in the next read
+        self.bus_error = False  # fail every write, as when the sensor is disconnected
+
+    def write(self, data):
+        if self.bus_error:
+            raise OSError(19, "I2C bus error")
+        self.commands.append(data)
+        if data == BREAK:
+            self.mode = None
+        elif data == FETCH_DATA:
+            if self.mode is None:
+                raise OSError(19, "NACK")  # no periodic measurement to fetch
+        elif data in PERIODIC_COMMANDS:
+            if self.mode is not None:
+                raise OSError(19, "NACK")  # only fetch and break are accepted in periodic mode
+            self.mode = data
+        else:
+            raise OSError(19, "NACK")
+
+    def read(self, buf):
+        temperature = round((self.celsius + 45) * 65535 / 175)
+        humidity = round(self.humidity * 65535 / 100)
+        data = bytearray(temperature.to_bytes(2, 'big') + b'\x00' + humidity.to_bytes(2, 'big') + b'\x00')
+        data[2] = crc8(data, 0, 2)
+        data[5] = crc8(data, 3, 5)
+        if self.corrupt is not None:
+            data[self.corrupt] ^= 0x01
+            self.corrupt = None
+        buf[:] = data
+
+
+class FakeLogger:
+    def __init__(self):
+        self.binary = False
+        self.rows = []
+
+    def log_row(self, row, reading):
+        self.rows.append(row)
+
+    def exception(self, msg):
+        raise AssertionError(msg)
+
+
+@pytest.fixture
+def sensor_on_bus(monkeypatch):
+    monkeypatch.setattr(TempSHT35.time, "sleep", lambda seconds: None)
+    config.set_config({"TEMP": "SHT35", "TEMP_period": 30})
+    device = FakeSHT35()
+    original_init = I2C.__init__
+
+    def init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        self.attach(0x45, device)
+
+    monkeypatch.setattr(I2C, "__init__", init)
+    return device
+
+
+def test_periodic_mode_selection():
+    assert periodic_mode(30) == PERIODIC_MODES[0]  # 0.5 mps
+    assert periodic_mode(2) == PERIODIC_MODES[1]  # 1 mps
+    assert periodic_mode(1) == PERIODIC_MODES[2]  # 2 mps
+    assert periodic_mode(0.1) == PERIODIC_MODES[-1]
+
+
+def test_start_and_read(sensor_on_bus):
+    sensor = Sensor(FakeLogger(), FakeLogger())
+    assert sensor_on_bus.commands[:2] == [BREAK, PERIODIC_MODES[0][1]]
+    celsius, humidity = sensor.read()
+    assert celsius == pytest.approx(21.5, abs=0.01)
+    assert humidity == pytest.approx(45.0, abs=0.01)
+
+
+def test_start_after_soft_reset(sensor_on_bus):
+    sensor_on_bus.mode = PERIODIC_MODES[2][1]  # still in periodic mode from before the reset
+    sensor = Sensor(FakeLogger(), FakeLogger())
+    assert sensor_on_bus.mode == PERIODIC_MODES[0][1]
+    assert sensor.read()[0] == pytest.approx(21.5, abs=0.01)
+
+
+def test_crc_mismatch(sensor_on_bus):
+    sensor = Sensor(FakeLogger(), FakeLogger())
+    sensor_on_bus.corrupt = 1
+    with pytest.raises(RuntimeError, match="temperature"):
+        sensor.read()
+    sensor_on_bus.corrupt = 4
+    with pytest.raises(RuntimeError, match="humidity"):
+        sensor.read()
+
+
+def test_config_changed_restarts_periodic_mode(sensor_on_bus):
+    sensor = Sensor(FakeLogger(), FakeLogger())
+    config.set_config({"TEMP_period": 1})
+    assert sensor_on_bus.mode == PERIODIC_MODES[2][1]
+    assert sensor_on_bus.commands[-2:] == [BREAK, PERIODIC_MODES[2][1]]
+    assert sensor.processing_alarm.period_ms == 1000
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.messages = []
+
+    def exception(self, msg):
+        self.messages.append(msg)
+
+
+def test_config_changed_keeps_polling_if_restart_fails(sensor_on_bus):
+    status_logger = RecordingLogger()
+    sensor = Sensor(FakeLogger(), status_logger)
+    sensor_on_bus.bus_error = True
+    config.set_config({"TEMP_period": 1})
+    assert status_logger.messages == ["Failed to restart temperature sensor with a period of 1s"]
+    assert sensor.processing_alarm.active
+    assert sensor.processing_alarm.period_ms == 1000
+
+
+def test_process_readings_logs_row(sensor_on_bus):
+    sensor_logger = FakeLogger()
+    sensor = Sensor(sensor_logger, FakeLogger())
+    sensor_on_bus.celsius = -4.2
+    sensor.process_readings(None)
+    timestamp, celsius, humidity = sensor_logger.rows[-1].split(',')
+    assert (celsius, humidity) == ("-42", "450")
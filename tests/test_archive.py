@@ -0,0 +1,22 @@
+import os
+
+import archive
+import strings as s
+
+
+def test_segments_are_archived_per_day_in_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(s, "archive_path", str(tmp_path) + '/')
+    monkeypatch.setattr(archive.time, "gmtime", lambda: (2020, 3, 7, 12, 30, 5, 5, 67))
+
+    paths = []
+    for content in ("a,1\n", "b,2\n"):
+        source = tmp_path / "PM1.csv"
+        source.write_text(content)
+        paths.append(archive.archive_segment(str(source), s.PM1, "5", s.csv_extension))
+
+    directory = archive.archive_dir(s.PM1, "5", (2020, 3, 7))
+    assert directory == str(tmp_path) + "/PM1_5/2020_03/07/"
+    assert paths == [directory + "123005" + s.csv_extension, directory + "123005_1" + s.csv_extension]
+    assert archive.segments(directory) == paths
+    assert b''.join(archive.read_segments(directory)) == b"a,1\nb,2\n"
+    assert os.listdir(str(tmp_path) + "/PM1_5/2020_03") == ["07"]
@@ -0,0 +1,39 @@
+import strings as s
+from Configuration import config
+from RunningAverage import get_running_average
+from averages import calculate_average
+
+
+class FakeLogger:
+    def __init__(self):
+        self.messages = []
+
+    def debug(self, msg):
+        self.messages.append(("debug", msg))
+
+    def error(self, msg):
+        self.messages.append(("error", msg))
+
+    def warning(self, msg):
+        self.messages.append(("warning", msg))
+
+    def exc(self, e, msg):
+        self.messages.append(("exception", msg))
+
+    def exception(self, msg):
+        self.messages.append(("exception", msg))
+
+
+def test_average_kept_if_file_cannot_be_moved(monkeypatch):
+    config.set_config(dict(s.default_configuration))
+    monkeypatch.setattr(s, "current_path", "/nonexistent/Current/")
+    running_average = get_running_average(s.TEMP)
+    running_average.add([215, 450])
+    running_average.add([225, 460])
+
+    logger = FakeLogger()
+    result = calculate_average(s.TEMP, logger)
+
+    assert result == {"TEMP_avg": ["220", "455"], "TEMP_count": 2}
+    assert ("exception", "Failed to move readings from sensor TEMP to processing") in logger.messages
+    assert not [level for level, msg in logger.messages if level == "error"]  # no placeholders were sent
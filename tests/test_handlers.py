@@ -0,0 +1,31 @@
+import loggingpycom as logging
+from loggingpycom import handlers
+
+
+def queue_logger(tmp_path, name, capacity=handlers.QUEUE_CAPACITY_DEFAULT):
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    file_handler = handlers.RotatingFileHandler(str(tmp_path / "status_log.txt"))
+    queue_handler = handlers.QueueHandler(capacity)
+    queue_handler.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
+    logger.addHandler(queue_handler)
+    return logger, handlers.QueueListener(queue_handler, file_handler), file_handler
+
+
+def test_flush_writes_queued_records(tmp_path):
+    logger, listener, file_handler = queue_logger(tmp_path, "flush")
+    logger.info("Reset triggered over LoRa")
+    logger.info("Rebooting...")
+    listener.flush()  # writer thread is not started, records are only written by flush
+    file_handler.close()
+    assert (tmp_path / "status_log.txt").read_text() == "INFO - Reset triggered over LoRa\nINFO - Rebooting...\n"
+
+
+def test_flush_reports_dropped_records(tmp_path):
+    logger, listener, file_handler = queue_logger(tmp_path, "dropped", capacity=2)
+    for i in range(5):
+        logger.info("record %d", i)
+    listener.flush()
+    file_handler.close()
+    assert (tmp_path / "status_log.txt").read_text().splitlines() == [
+        "3 log records dropped", "INFO - record 3", "INFO - record 4"]
@@ -0,0 +1,140 @@
+import struct
+import os
+
+import pytest
+
+import strings as s
+from lora_payload import cast_message, pack_message, decode_payload, encode_compact, decode_compact, compact_indices, \
+    write_varint, read_varint, zigzag, unzigzag, time_on_air_ms
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "2020_03_Sensor_Averages.csv")
+
+
+def buffer_lines():
+    """
+    Lines of the recorded averages as they are written to the lora buffer, newest first
+    """
+    lines = []
+    with open(DATA) as f:
+        for line in f:
+            timestamp, line = line.strip().split(',', 1)
+            lines.append(timestamp[2:4] + "," + timestamp[5:7] + "," + line)
+    lines.reverse()
+    return lines
+
+
+def fits_structure(fmt, values):
+    try:
+        struct.pack(getattr(s, fmt)["structure"], *values)
+        return True
+    except (struct.error, OverflowError):
+        return False
+
+
+def compact_runs():
+    """
+    Runs of consecutive messages with the same integer format and sensor ids, as they are delta encoded
+    """
+    runs = []
+    for line in buffer_lines():
+        fmt, values = cast_message(line)
+        if fmt == "G":
+            continue
+        ids = tuple(values[i] for i in compact_indices(fmt)[1])
+        if runs and runs[-1][0] == fmt and runs[-1][1] == ids:
+            runs[-1][2].append(values)
+        else:
+            runs.append((fmt, ids, [values]))
+    return runs
+
+
+def test_varint_zigzag_round_trip():
+    for value in (0, 1, -1, 63, -64, 64, 127, 128, 255, 256, -300, 16383, 16384, 65535, -65536):
+        out = bytearray()
+        write_varint(out, zigzag(value))
+        decoded, offset = read_varint(out, 0)
+        assert unzigzag(decoded) == value
+        assert offset == len(out)
+
+
+def test_single_messages_round_trip():
+    for line in buffer_lines():
+        fmt, values = cast_message(line)
+        if not fits_structure(fmt, values):
+            continue  # values above 255 only fit compact payloads
+        port, packed_values, payload = pack_message(line)
+        assert port == getattr(s, fmt)["port"]
+        decoded = decode_payload(port, payload)
+        assert len(decoded) == 1
+        assert decoded[0][0] == fmt
+        assert decoded[0][1] == pytest.approx(tuple(values), rel=1e-6)
+
+
+def test_batch_round_trip():
+    lines = [line for line in buffer_lines() if fits_structure(*cast_message(line))]
+    batch = bytearray([s.BATCH["fmt_version"]])
+    for line in lines:
+        port, values, payload = pack_message(line)
+        batch.append(port)
+        batch += payload
+
+    decoded = decode_payload(s.BATCH["port"], bytes(batch))
+    assert [fmt for fmt, values in decoded] == [cast_message(line)[0] for line in lines]
+    for (fmt, values), line in zip(decoded, lines):
+        assert values == pytest.approx(tuple(cast_message(line)[1]), rel=1e-6)
+
+
+def test_compact_round_trip_with_ids():
+    for fmt, ids, messages in compact_runs():
+        payload = encode_compact(fmt, messages, ids)
+        decoded_ids, decoded = decode_compact(payload)
+        assert decoded_ids == ids
+        assert decoded == [(fmt, tuple(values[1:])) for values in messages]
+        assert decode_payload(s.COMPACT["port"], payload) == decoded
+
+
+def test_compact_round_trip_without_ids():
+    for fmt, ids, messages in compact_runs():
+        payload = encode_compact(fmt, messages)
+        assert len(payload) < len(encode_compact(fmt, messages, ids))
+        decoded_ids, decoded = decode_compact(payload, ids)
+        assert decoded_ids == ids
+        assert decoded == [(fmt, tuple(values[1:])) for values in messages]
+
+        with pytest.raises(ValueError):
+            decode_compact(payload)  # ids are neither in the payload nor known
+
+
+def test_compact_negative_deltas_and_large_values():
+    # temperature falls below zero, PM values and counts do not fit a byte
+    messages = [[1, 1500, 1, -45, 941, 300, 2, 312, 266, 450],
+                [1, 1485, 1, 17, 902, 30, 2, 31, 22, 65535],
+                [1, 1470, 1, -300, 0, 0, 2, 1000, 255, 0]]
+    ids = (1, 2)
+    payload = encode_compact("TP", messages, ids)
+    decoded_ids, decoded = decode_compact(payload)
+    assert decoded == [("TP", tuple(values[1:])) for values in messages]
+    assert fits_structure("TP", messages[0]) is False  # 312 is only sent in compact payloads
+
+
+def test_compact_smaller_than_batch():
+    for fmt, ids, messages in compact_runs():
+        if len(messages) < 2 or not all(fits_structure(fmt, values) for values in messages):
+            continue
+        structure = getattr(s, fmt)["structure"]
+        batch_length = 1 + len(messages) * (1 + struct.calcsize(structure))
+        assert len(encode_compact(fmt, messages)) < batch_length
+
+
+def test_unknown_compact_version():
+    payload = bytearray(encode_compact("T", [[1, 15, 1, 52, 871, 30]], (1,)))
+    payload[0] = s.COMPACT["fmt_version"] + 1
+    with pytest.raises(ValueError):
+        decode_compact(bytes(payload))
+
+
+def test_time_on_air():
+    assert time_on_air_ms(10, 7) == 62  # 61.7 ms
+    assert time_on_air_ms(11, 10) == 371  # 370.7 ms
+    assert time_on_air_ms(51, 12) == 2794
+    assert time_on_air_ms(222, 7) > 4 * time_on_air_ms(26, 7)
@@ -0,0 +1,67 @@
+import pytest
+
+from machine import UART
+from sensor_frames import plantower_frame
+from plantowerpycom import Plantower, PlantowerException
+
+VALUES = [3, 5, 6, 3, 5, 6, 780, 231, 44, 4, 1, 300]
+
+
+@pytest.fixture
+def sensor():
+    plantower = Plantower(read_timeout=0.05)
+    plantower.serial = UART.last
+    return plantower
+
+
+def test_reads_frame(sensor):
+    sensor.serial.feed(plantower_frame(VALUES))
+    reading = sensor.read()
+    assert (reading.pm10_cf1, reading.pm25_cf1, reading.pm100_cf1) == (3, 5, 6)
+    assert (reading.gr03um, reading.gr100um) == (780, 300)
+    assert reading.values() == (3, 3, 5, 5, 6, 6, 780, 231, 44, 4, 1, 300)
+
+
+def test_resynchronises_after_noise(sensor):
+    # noise and a start character that is not followed by the second one
+    frame = plantower_frame(VALUES)
+    sensor.serial.feed(b'\x00\x13\x42\x00\x42' + frame)
+    assert sensor.read().gr100um == 300
+    assert sensor.filled == 0
+
+    # a frame cut off fails the checksum, the complete frame after it is found by the next read
+    sensor.serial.feed(frame[:10] + frame)
+    with pytest.raises(PlantowerException, match="Checksum"):
+        sensor.read()
+    assert sensor.read().gr100um == 300
+
+
+def test_keeps_bytes_of_the_next_frame(sensor):
+    second = list(VALUES)
+    second[0] = 9
+    sensor.serial.feed(plantower_frame(VALUES) + plantower_frame(second))
+    assert sensor.read().pm10_cf1 == 3
+    assert sensor.read().pm10_cf1 == 9
+
+
+def test_frame_split_across_reads(sensor):
+    frame = plantower_frame(VALUES)
+    sensor.serial.feed(frame[:7])
+    with pytest.raises(PlantowerException, match="No message"):
+        sensor.read()
+    sensor.serial.feed(frame[7:])
+    assert sensor.read().pm100_cf1 == 6
+
+
+def test_checksum_failure(sensor):
+    frame = bytearray(plantower_frame(VALUES))
+    frame[10] ^= 0x01
+    sensor.serial.feed(bytes(frame) + plantower_frame(VALUES))
+    with pytest.raises(PlantowerException, match="Checksum"):
+        sensor.read()
+    assert sensor.read().pm10_cf1 == 3  # next frame is found after the corrupted one
+
+
+def test_timeout_without_data(sensor):
+    with pytest.raises(PlantowerException, match="No message"):
+        sensor.read()